@@ -1,12 +1,21 @@
-from docx import Document
+from collections import namedtuple
+import os
 import re
-from tqdm import tqdm
-from lxml import etree
-import zipfile
+from docx_stream import iter_footnotes, iter_paragraphs
+from metrics import RunMetrics
+from word_matcher import WordMatcher
+
+# How an abbreviation is used: the number of occurrences, the first location as ("paragraph" or
+# "footnote", index), and whether it is not used at all
+AbbreviationUsage = namedtuple('AbbreviationUsage', ['count', 'first_location', 'unused'])
 
 def read_docx(file_path):
     """Read the content of a Word document and extract abbreviations from the 'LIST OF ABBREVIATIONS' section."""
-    doc = Document(file_path)
+    # Stream the paragraphs rather than loading the whole document tree
+    return split_manuscript(para.text for para in iter_paragraphs(file_path))
+
+def split_manuscript(paragraph_texts):
+    """Split paragraph texts into the listed abbreviations and the manuscript lines from 'CHAPTER 1' on."""
     abbreviations = []
     manuscript_lines = []
     
@@ -14,8 +23,8 @@ def read_docx(file_path):
     list_started = False
     chapter_started = False
 
-    for para in doc.paragraphs:
-        text = para.text.strip()
+    for text in paragraph_texts:
+        text = text.strip()
         if text:  # Ignore empty paragraphs
             if text.upper() == "LIST OF ABBREVIATIONS":
                 list_started = True
@@ -37,25 +46,14 @@ def read_docx(file_path):
 
     return abbreviations, manuscript_lines
 
-def get_footnotes(docx_file):
-    """Extract footnotes from the Word document using XML parsing."""
-    footnotes = []
-
-    # Open the DOCX file as a zip archive
-    with zipfile.ZipFile(docx_file, 'r') as docx_zip:
-        # Check if footnotes.xml exists in the archive
-        if 'word/footnotes.xml' in docx_zip.namelist():
-            footnote_xml = docx_zip.read('word/footnotes.xml')
-            footnote_tree = etree.fromstring(footnote_xml)
-
-            # Extract footnote text
-            for footnote in footnote_tree.xpath('//w:footnote', namespaces={'w': 'http://schemas.openxmlformats.org/wordprocessingml/2006/main'}):
-                texts = [node.text for node in footnote.xpath('.//w:t', namespaces={'w': 'http://schemas.openxmlformats.org/wordprocessingml/2006/main'})]
-                # Join the texts to form the complete footnote
-                footnotes.append(''.join(texts))
+def read_footnotes(docx_file):
+    """Extract the text of each footnote from the Word document."""
+    return [footnote.text for footnote in iter_footnotes(docx_file)]
 
+def get_footnotes(docx_file):
+    """Extract footnotes from the Word document as a single string."""
     # Join all footnotes into a single string for easier searching
-    return ' '.join(footnotes)
+    return ' '.join(read_footnotes(docx_file))
 
 def search_in_doc(element, manuscript_lines, footnotes_text):
     """Search for an abbreviation in the manuscript and footnotes (ignoring punctuation/whitespace)."""
@@ -70,26 +68,53 @@ def search_in_doc(element, manuscript_lines, footnotes_text):
     
     return found_in_text or found_in_footnotes
 
-def main(source_file):
+def scan_abbreviations(abbreviations, manuscript_lines, footnotes):
+    """Find every abbreviation's uses in a single pass over the manuscript lines and footnotes.
+
+    Returns {abbreviation: AbbreviationUsage}. The first location is the first manuscript line
+    using the abbreviation, or the first footnote if it is only used in footnotes.
+    """
+    # Match on the abbreviation without surrounding punctuation, as search_in_doc does
+    stripped = {element: element.strip('. “”‘’,') for element in abbreviations if element}
+    stripped = {element: term for element, term in stripped.items() if term}
+
+    matcher = WordMatcher(stripped.values())
+    counts = dict.fromkeys(matcher.terms, 0)
+    first_locations = {}
+
+    for kind, texts in (("paragraph", manuscript_lines), ("footnote", footnotes)):
+        for index, text in enumerate(texts):
+            for _, _, term in matcher.finditer(text):
+                counts[term] += 1
+                first_locations.setdefault(term, (kind, index))
+
+    return {element: AbbreviationUsage(counts[term], first_locations.get(term), term not in first_locations)
+            for element, term in stripped.items()}
+
+def main(source_file, metrics=None, report_path=None):
+    if metrics is None:
+        metrics = RunMetrics()
+
     # Step 1: Read and split lines from the Word file
-    abbreviations, manuscript_lines = read_docx(source_file)
+    with metrics.stage('read_docx'):
+        abbreviations, manuscript_lines = read_docx(source_file)
     
     # Step 2: Extract footnotes
-    footnotes_text = get_footnotes(source_file)  # Reuse the footnote extraction function
+    with metrics.stage('read_footnotes'):
+        footnotes = read_footnotes(source_file)
     
-    # Step 3: Filter abbreviations that are not found in the manuscript section or footnotes
-    not_found_abbreviations = []
-    
-    # Use tqdm to create a progress bar
-    for element in tqdm(abbreviations, desc="Processing abbreviations", unit="abbr"):
-        if element:  # Ignore empty lines
-            stripped_element = element.strip('. “”‘’,')
-            found = search_in_doc(stripped_element, manuscript_lines, footnotes_text)
-            
-            # If not found, add to the list of not found abbreviations
-            if not found:
-                not_found_abbreviations.append(element)
-                print(f"Not found: {stripped_element}")
+    # Step 3: Scan the manuscript and footnotes once for all abbreviations
+    with metrics.stage('scan_abbreviations'):
+        usage = scan_abbreviations(abbreviations, manuscript_lines, footnotes)
+
+    metrics.count('abbreviations', len(abbreviations))
+    metrics.count('manuscript_lines', len(manuscript_lines))
+    metrics.count('footnotes', len(footnotes))
+    metrics.count('abbreviation_matches', sum(element_usage.count for element_usage in usage.values()))
+
+    # Filter abbreviations that are not found in the manuscript section or footnotes
+    not_found_abbreviations = [element for element, element_usage in usage.items() if element_usage.unused]
+    metrics.count('unused_abbreviations', len(not_found_abbreviations))
     
     # Step 4: Print the list of abbreviations not found
     if not_found_abbreviations:
@@ -99,7 +124,13 @@ def main(source_file):
     else:
         print("All abbreviations were found.")
 
+    # Step 5: Write the run report (stage timings, counters and peak memory)
+    if report_path is not None:
+        metrics.write_report(report_path)
+        print(f"\nRun report written to {report_path}")
+
 # Example usage
-source_file = 'Dissertation.docx'  # The Word file containing abbreviations and manuscript
+if __name__ == "__main__":
+    source_file = 'Dissertation.docx'  # The Word file containing abbreviations and manuscript
 
-main(source_file)
+    main(source_file, report_path=os.path.splitext(source_file)[0] + '.abbreviations.run.json')
@@ -1,89 +1,288 @@
-from docx import Document
+from collections import Counter, namedtuple
+import heapq
+import os
 import re
-import zipfile
-from lxml import etree
-
-### NOTE: probably need to start with bibliography, store all the data, and then create the citations from that. 
+from bibliography import Bibliography
+from docx_stream import iter_footnotes
+from metrics import RunMetrics
+from spans import SpanMask
 
 def read_docx(file_path):
-    """Read the content of a Word document and return footnotes."""
-    footnotes = []
-    with zipfile.ZipFile(file_path, 'r') as docx_zip:
-        if 'word/footnotes.xml' in docx_zip.namelist():
-            footnote_xml = docx_zip.read('word/footnotes.xml')
-            footnote_tree = etree.fromstring(footnote_xml)
-            for footnote in footnote_tree.xpath('//w:footnote', namespaces={'w': 'http://schemas.openxmlformats.org/wordprocessingml/2006/main'}):
-                footnote_text = []
-                for paragraph in footnote.xpath('.//w:p', namespaces={'w': 'http://schemas.openxmlformats.org/wordprocessingml/2006/main'}):
-                    for run in paragraph.xpath('.//w:r', namespaces={'w': 'http://schemas.openxmlformats.org/wordprocessingml/2006/main'}):
-                        text = run.xpath('.//w:t/text()', namespaces={'w': 'http://schemas.openxmlformats.org/wordprocessingml/2006/main'})
-                        if text:
-                            run_text = ''.join(text)
-                            # Check for italics and wrap italic text in quotes
-                            if run.xpath('.//w:rPr/w:i', namespaces={'w': 'http://schemas.openxmlformats.org/wordprocessingml/2006/main'}):
-                                run_text = f'"{run_text}"'  # Wrap italic text in double quotes
-                            footnote_text.append(run_text)
-
-                footnotes.append(''.join(footnote_text))
-    print(footnotes)
-    
-    return footnotes
+    """Read the footnotes of a Word document, each as a spans.SpanMask of its text and italics."""
+    return [SpanMask.from_runs(footnote.runs) for footnote in iter_footnotes(file_path)]
+
+# A surname and comma, where a citation's title would start
+surname_pattern = re.compile(r'([A-Z][a-zA-Z]+), ')
+
+# A title in double or single quotes
+quoted_title_pattern = re.compile(r'["“]([^"“”]+)["”]|‘([^‘’]+)’')
+
+def iter_citations(footnote):
+    """Yield (surname, title, citation text) for each "Surname, title" citation in a footnote's SpanMask.
+
+    The title is either in quotes or italic; an italic title is written in straight quotes in
+    the citation text, so both kinds read as "Surname, "Title"". Which text is italic is looked
+    up in the mask by offset, so the footnote text is never rewritten.
+    """
+    text = footnote.text
+    title_end = 0  # End of the last title returned; "Surname, " matches inside a title are not citations
+    for match in surname_pattern.finditer(text):
+        if match.start() < title_end or footnote.italic_end(match.start()) is not None:
+            continue
+
+        surname, title_start = match.group(1), match.end()
+        italic_end = footnote.italic_end(title_start)
+        if italic_end is not None:
+            title_end = italic_end
+            title = text[title_start:italic_end]
+            yield surname, title, f'{surname}, "{title}"'
+            continue
+
+        quoted = quoted_title_pattern.match(text, title_start)
+        if quoted:
+            title_end = quoted.end()
+            yield surname, quoted.group(1) or quoted.group(2), text[match.start():quoted.end()].strip()
+
+# A short citation split into its surname and title phrase (straight quotes come from italics)
+short_parts_pattern = re.compile(r'([A-Z][a-zA-Z]+), (?:["“]([^"“”]+)["”]|‘([^‘’]+)’)')
+
+def short_citation_parts(short_citation):
+    """Return a short citation's (surname, title phrase), or None if it does not look like one."""
+    match = short_parts_pattern.match(short_citation)
+    if not match:
+        return None
+    return match.group(1), (match.group(2) or match.group(3)).strip(',. ')
 
 def find_short_citations(footnotes):
     """Find short citations following the pattern 'Capitalized word(s), quoted or italicized phrase'."""
     short_citations = []
-    short_citation_pattern = re.compile(r'([A-Z][a-zA-Z]+), (["“][^"“”]+["”]|‘[^‘’]+’)')  # Regex pattern for short citations
-    
     for footnote in footnotes:
-        matches = short_citation_pattern.findall(footnote)
-        if matches:
-            for match in matches:
-                citation = f'{match[0]}, {match[1]}'
-                short_citations.append(citation.strip())
-    
+        for _, _, citation in iter_citations(footnote):
+            short_citations.append(citation)
+
     return list(set(short_citations))  # Remove duplicates
 
 def find_long_citation(short_citation, footnotes):
     """Find the long citation in the footnotes using the capitalized part of the short citation."""
     # Extract the capitalized word(s) and the quoted phrase from the short citation
-    match = re.match(r'([A-Z][a-zA-Z]+), [“‘]([^“”‘’]+)[’”]', short_citation)
-    if not match:
+    parts = short_citation_parts(short_citation)
+    if not parts:
         return None
-    
-    capitalized_part = re.escape(match.group(1))
-    phrase_part = match.group(2).strip(',. ')
+    capitalized_part, phrase_part = parts
 
     # Search for the capitalized part followed by the phrase part in the footnotes
-    long_citation_pattern = re.compile(rf'({capitalized_part}, [“‘"][^"“‘’”]*{phrase_part}[^"“‘’”]*[’”"])')
     for footnote in footnotes:
-        long_match = long_citation_pattern.search(footnote)
-        if long_match:
-            return long_match.group(1).strip()
-    
+        if capitalized_part not in footnote.text:
+            continue
+        for surname, title, citation in iter_citations(footnote):
+            if surname.endswith(capitalized_part) and phrase_part in title:
+                return citation[len(surname) - len(capitalized_part):]
+
     return None
 
-def main(file_path):
-    # Step 1: Read footnotes
-    footnotes = read_docx(file_path)
+# One citation found in the footnotes: its 1-based footnote number, the title inside the quotes,
+# and the citation text
+CitationEntry = namedtuple('CitationEntry', ['footnote', 'title', 'text'])
 
-    # Step 2: Find short citations in the footnotes
-    short_citations = find_short_citations(footnotes)
+def title_tokens(title):
+    return set(re.findall(r'\w+', title.lower()))
+
+def title_grams(title):
+    """Return the character trigrams of a title, ignoring case, punctuation and spacing."""
+    text = ' ' + ' '.join(re.findall(r'\w+', title.lower())) + ' '
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+class CitationIndex:
+    """Inverted index of every "Surname, quoted title" citation in the footnotes.
+
+    Citations are posted under their surname (and under any capitalized tail of it, so "Wright"
+    also finds "McWright" as find_long_citation does) and under each title word. Resolving a short
+    citation is then a hash lookup plus a check of a few candidates, instead of a regex compile
+    and a scan of every footnote.
+
+    The first use of each citation is also posted under the character trigrams of its title, so
+    an abbreviated or reworded short title can be matched against the titles that share the most
+    trigrams with it, without comparing it to every citation.
+    """
+
+    def __init__(self, footnotes):
+        self.entries = []
+        self.by_surname = {}
+        self.by_token = {}
+        self.by_gram = {}
+        self.first_footnote = {}  # Citation text -> footnote number of its first use
+
+        for footnote_number, footnote in enumerate(footnotes, start=1):
+            for surname, title, citation in iter_citations(footnote):
+                position = len(self.entries)
+                entry = CitationEntry(footnote_number, title, citation)
+                self.entries.append(entry)
+                if entry.text not in self.first_footnote:
+                    self.first_footnote[entry.text] = footnote_number
+                    for gram in title_grams(entry.title):
+                        self.by_gram.setdefault(gram, set()).add(position)
+
+                for i, char in enumerate(surname):
+                    if char.isupper():
+                        self.by_surname.setdefault(surname[i:], []).append(position)
+                for token in title_tokens(entry.title):
+                    self.by_token.setdefault(token, set()).add(position)
+
+    def find_long_citation(self, short_citation):
+        """Return (long citation, footnote number of its first use), or None if it is not found.
 
-    # Step 3: Build a dictionary of short citations and corresponding long citations
+        This is the earliest citation with the same surname whose title contains the short
+        citation's phrase, preferring one whose title is longer than the phrase (a full citation
+        rather than another use of the short form).
+        """
+        parts = short_citation_parts(short_citation)
+        if not parts:
+            return None
+
+        surname, phrase = parts
+        candidates = self.by_surname.get(surname, [])
+
+        # Words strictly inside the phrase are whole words of the title, so their postings can
+        # narrow a long candidate list (the first and last words may be partial)
+        inner_tokens = re.findall(r'\w+', phrase.lower())[1:-1]
+        if len(candidates) > 8 and inner_tokens:
+            postings = min((self.by_token.get(token, set()) for token in inner_tokens), key=len)
+            candidates = [position for position in candidates if position in postings]
+
+        found = None
+        for position in candidates:
+            entry = self.entries[position]
+            if phrase in entry.title:
+                if len(entry.title.strip(',. ')) > len(phrase):
+                    return entry.text, entry.footnote
+                if found is None:
+                    found = entry.text, entry.footnote
+
+        return found
+
+    def find_similar_citation(self, short_citation, top_k=5, min_score=0.6):
+        """Return (long citation, footnote number, score) for the closest title by the same author.
+
+        For short titles that are not a literal part of the long title ("Wright, Jesus and
+        Victory" for "Jesus and the Victory of God"). The top_k titles sharing the most trigrams
+        with the phrase are scored by the share of the phrase's trigrams and words (as prefixes,
+        so "Theol." matches "Theology") found in the title. Returns None if no title scores at
+        least min_score.
+        """
+        parts = short_citation_parts(short_citation)
+        if not parts:
+            return None
+
+        surname, phrase = parts
+        grams = title_grams(phrase)
+        same_author = set(self.by_surname.get(surname, ()))
+        if not grams or not same_author:
+            return None
+
+        # Count shared trigrams for the same author's citations only; & walks the smaller set
+        shared = Counter()
+        for gram in grams:
+            shared.update(self.by_gram.get(gram, set()) & same_author)
+
+        phrase_words = re.findall(r'\w+', phrase.lower())
+        best = None
+        for position, count in heapq.nlargest(top_k, shared.items(), key=lambda item: (item[1], -item[0])):
+            entry = self.entries[position]
+            title_words = re.findall(r'\w+', entry.title.lower())
+            if len(title_words) <= len(phrase_words):
+                continue  # Another short form, not a full title
+
+            found_words = sum(any(word.startswith(phrase_word) for word in title_words) for phrase_word in phrase_words)
+            score = (count / len(grams) + found_words / len(phrase_words)) / 2
+            if score >= min_score and (best is None or score > best[2]):
+                best = entry.text, entry.footnote, score
+
+        return best
+
+def resolve_citations(footnotes):
+    """Resolve each short citation in the footnotes to its long citation.
+
+    Returns the {short citation: long citation} dictionary and (short citation, note of first
+    use, note of the full citation) for short citations used before their full citation.
+    """
+    short_citations = find_short_citations(footnotes)
+    citation_index = CitationIndex(footnotes)
     citation_dict = {}
+    early_short_citations = []
     
     for short_citation in short_citations:
-        long_citation = find_long_citation(short_citation, footnotes)
-        if long_citation:
+        found = citation_index.find_long_citation(short_citation)
+        if found is None or found[0] == short_citation:
+            # Only the short form itself was found, so look for a similar full title
+            similar = citation_index.find_similar_citation(short_citation)
+            if similar:
+                found = similar[:2]
+
+        if found:
+            long_citation, long_footnote = found
             citation_dict[short_citation] = long_citation
+
+            # The full citation should come first
+            short_footnote = citation_index.first_footnote.get(short_citation)
+            if short_footnote is not None and short_footnote < long_footnote:
+                early_short_citations.append((short_citation, short_footnote, long_footnote))
         else:
             citation_dict[short_citation] = "Long citation not found"
 
-    # Step 4: Print the dictionary of short to long citations
+    return citation_dict, early_short_citations
+
+def find_bibliography_entries(short_citations, bibliography):
+    """Return {short citation: bibliography.BibEntry or None} for each short citation."""
+    entries = {}
+    for short_citation in short_citations:
+        parts = short_citation_parts(short_citation)
+        entries[short_citation] = bibliography.lookup(*parts) if parts else None
+    return entries
+
+def main(file_path, bibliography=None, metrics=None, report_path=None):
+    if metrics is None:
+        metrics = RunMetrics()
+
+    # Step 1: Read footnotes
+    with metrics.stage('read_footnotes'):
+        footnotes = read_docx(file_path)
+
+    # Step 2: Find short citations in the footnotes and build a dictionary of the corresponding long citations
+    with metrics.stage('resolve_citations'):
+        citation_dict, early_short_citations = resolve_citations(footnotes)
+
+    metrics.count('footnotes', len(footnotes))
+    metrics.count('short_citations', len(citation_dict))
+    metrics.count('long_citations_not_found', sum(long_citation == "Long citation not found"
+                                                  for long_citation in citation_dict.values()))
+    metrics.count('early_short_citations', len(early_short_citations))
+
+    # Step 3: Print the dictionary of short to long citations
     print("Citation Dictionary:")
     for short_citation, long_citation in citation_dict.items():
         print(f"{short_citation} -> {long_citation}")
 
+    # Step 4: Print short citations used before their full citation
+    for short_citation, short_footnote, long_footnote in early_short_citations:
+        print(f"{short_citation} used in note {short_footnote} before the full citation in note {long_footnote}")
+
+    # Step 5: Check each short citation against the parsed bibliography, when there is one
+    if bibliography is not None:
+        with metrics.stage('bibliography_lookup'):
+            entries = find_bibliography_entries(citation_dict, bibliography)
+
+        print("\nBibliography Entries:")
+        for short_citation, entry in entries.items():
+            print(f"{short_citation} -> {entry.text if entry else 'Not in bibliography'}")
+
+    # Step 6: Write the run report (stage timings, counters and peak memory)
+    if report_path is not None:
+        metrics.write_report(report_path)
+        print(f"\nRun report written to {report_path}")
+
 # Example usage
-source_file = 'Dissertation.docx'  # The Word file containing footnotes
-main(source_file)
+if __name__ == "__main__":
+    source_file = 'Dissertation.docx'  # The Word file containing footnotes
+    bibliography_file = 'Dissertation.bib.json'  # Saved by auth_index from the dissertation's PDF
+    main(source_file, Bibliography.load(bibliography_file) if os.path.exists(bibliography_file) else None,
+         report_path=os.path.splitext(source_file)[0] + '.citations.run.json')
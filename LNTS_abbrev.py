@@ -1,54 +1,91 @@
+from bisect import bisect_right
+import contextlib
+import os
 import re
+import struct
+import tempfile
 import zipfile
+import zlib
 from docx import Document
-from xml.etree import ElementTree as ET
-
-# Function to wrap italicized text with %...%%
-def wrap_italic_in_percent(runs):
-    wrapped_text = ""
-    for run in runs:
-        if run.italic:
-            wrapped_text += f'%{run.text}%%' if run.text else ''
-        else:
-            wrapped_text += run.text if run.text else ''
-    return wrapped_text
-
-# Function to revert %...%% sections back to italics
-def revert_percent_to_italics(runs):
-    for run in runs:
-        if run.text and '%' in run.text:
-            run.text = re.sub(r'%(.+?)%%', r'\1', run.text)
-
-# Function to ignore text wrapped in smart quotes or %...%%
-def ignore_wrapped_text(text):
-    return re.sub(r'“.+?”|%.*?%%', '', text)
+from lxml import etree
+from docx_stream import DELETED_CONTENT, RUN_CONTENT, W_P, W_T, is_italic, text_runs
+from spans import SpanMask
+
+class AbbreviationReplacer:
+    """Replace abbreviations followed by a number (e.g. "Matt 5" -> "Mt. 5") in one pass.
+
+    All abbreviations are compiled once into a single longest-first alternation, and each match
+    is replaced through a dict lookup. Italic runs and text in smart quotes are left alone.
+    """
+
+    def __init__(self, abbrev_dict):
+        self.replacements = {old: new for old, new in abbrev_dict.items() if old != new}
+        alternation = '|'.join(re.escape(old) + (r'\b' if old[-1].isalnum() else '')
+                               for old in sorted(self.replacements, key=len, reverse=True))
+        self.pattern = re.compile(rf'\b({alternation})(?= \d+)') if self.replacements else None
+
+    def replace_text(self, text):
+        """Replace abbreviations in a plain string."""
+        if self.pattern is None:
+            return text
+        return self.pattern.sub(lambda match: self.replacements[match.group(1)], text)
+
+    def replace_in_runs(self, texts, italics):
+        """Replace abbreviations across a paragraph's runs, keeping each run's formatting.
+
+        texts and italics give each run's text and italic flag. Returns the new run texts, or
+        None if nothing changed. A match spanning several runs is written into the first of them.
+        Matches are checked against the paragraph's spans.SpanMask, built once from the runs.
+        """
+        if self.pattern is None:
+            return None
+
+        mask = SpanMask.from_runs(zip(texts, italics))
+        run_starts = mask.run_starts
+        edits = [(match.start(), match.end(), self.replacements[match.group(1)])
+                 for match in self.pattern.finditer(mask.text)
+                 if not mask.is_protected(match.start(), match.end())]
+        if not edits:
+            return None
+
+        # Apply from the end so the run offsets of earlier edits stay valid
+        new_texts = list(texts)
+        for start, end, replacement in reversed(edits):
+            first = bisect_right(run_starts, start) - 1
+            while run_starts[first] + len(texts[first]) <= start:  # Skip empty runs
+                first += 1
+            local_start = start - run_starts[first]
+            local_end = end - run_starts[first]
+            head = new_texts[first][:local_start]
+            tail = new_texts[first][local_end:] if local_end <= len(texts[first]) else ''
+            new_texts[first] = head + replacement + tail
+
+            # Trim the rest of the match from the following runs
+            following = first + 1
+            while following < len(texts) and run_starts[following] < end:
+                cut = end - run_starts[following]
+                new_texts[following] = new_texts[following][cut:] if cut < len(texts[following]) else ''
+                following += 1
+
+        return new_texts
 
 # Function to replace abbreviations in text
 def replace_abbreviations_in_text(text, abbrev_dict):
-    modified_text = text
-    for old, new in abbrev_dict.items():
-        pattern = rf'(\b{old}\b)( \d+)'
-        modified_text = re.sub(pattern, rf'{new}\2', modified_text)
-    return modified_text
+    return AbbreviationReplacer(abbrev_dict).replace_text(text)
 
 # Function to process paragraphs and replace abbreviations
 def process_paragraphs(doc, abbrev_dict):
+    replacer = AbbreviationReplacer(abbrev_dict)
+
     for paragraph in doc.paragraphs:
-        # Wrap italicized text temporarily
-        wrapped_text = wrap_italic_in_percent(paragraph.runs)
-        safe_text = ignore_wrapped_text(wrapped_text)
-
-        # Replace abbreviations in the paragraph text
-        modified = False
-        for old, new in abbrev_dict.items():
-            pattern = rf'(\b{old}\b)( \d+)'
-            if re.search(pattern, safe_text):
-                # Update paragraph text with modified text
-                paragraph.text = re.sub(pattern, rf'{new}\2', paragraph.text)
-                modified = True
-
-        if modified:
-            revert_percent_to_italics(paragraph.runs)
+        runs = paragraph.runs
+        new_texts = replacer.replace_in_runs([run.text for run in runs], [bool(run.italic) for run in runs])
+
+        # Only touch the runs that changed, so every run keeps its own formatting
+        if new_texts is not None:
+            for run, new_text in zip(runs, new_texts):
+                if run.text != new_text:
+                    run.text = new_text
 
 # Main processing function
 def process_document(input_file, output_file, abbrev_dict):
@@ -60,6 +97,151 @@ def process_document(input_file, output_file, abbrev_dict):
     # Save the document after processing paragraphs
     doc.save(output_file)
 
+# Parts of the .docx package that hold text to convert; everything else is copied unchanged
+REWRITTEN_PARTS = re.compile(r'word/(document|footnotes|endnotes|header\d*|footer\d*)\.xml')
+
+XML_SPACE = '{http://www.w3.org/XML/1998/namespace}space'
+
+def xml_paragraph_segments(paragraph):
+    """Return (w:t element or None, text, italic) for the text pieces of a w:p element, in order.
+
+    Tabs and breaks appear as pieces without an element, so they separate words but are never edited.
+    """
+    segments = []
+    # Runs of text boxes nested in the paragraph belong to their own w:p, which is rewritten on its own
+    for run in text_runs(paragraph, DELETED_CONTENT | {W_P}):
+        italic = is_italic(run)
+        for piece in run:
+            if piece.tag == W_T:
+                segments.append((piece, piece.text or '', italic))
+            elif piece.tag in RUN_CONTENT:
+                segments.append((None, RUN_CONTENT[piece.tag], italic))
+    return segments
+
+def rewrite_xml_part(data, replacer):
+    """Replace abbreviations in every paragraph of one XML part; returns the new bytes or None."""
+    root = etree.fromstring(data)
+    modified = False
+
+    for paragraph in root.iter(W_P):
+        segments = xml_paragraph_segments(paragraph)
+        new_texts = replacer.replace_in_runs([text for _, text, _ in segments], [italic for _, _, italic in segments])
+        if new_texts is None:
+            continue
+
+        for (element, text, _), new_text in zip(segments, new_texts):
+            if element is not None and new_text != text:
+                element.text = new_text
+                if new_text != new_text.strip():
+                    element.set(XML_SPACE, 'preserve')
+        modified = True
+
+    if not modified:
+        return None
+    return etree.tostring(root, xml_declaration=True, encoding='UTF-8', standalone=True)
+
+# Zip record layouts (APPNOTE.TXT): local file header, central directory header and end of
+# central directory, without zip64 extensions
+LOCAL_HEADER = struct.Struct('<IHHHHHIIIHH')
+CENTRAL_HEADER = struct.Struct('<IHHHHHHIIIHHHHHII')
+END_OF_CENTRAL_DIRECTORY = struct.Struct('<IHHHHIIH')
+DATA_DESCRIPTOR_FLAG = 0x08
+
+def dos_date_time(date_time):
+    """Pack a ZipInfo.date_time tuple into MS-DOS (time, date) fields."""
+    year, month, day, hour, minute, second = date_time
+    return hour << 11 | minute << 5 | second // 2, (year - 1980) << 9 | month << 5 | day
+
+def read_raw_member(file, info):
+    """Return a zip member's stored bytes exactly as they are in the file, still compressed."""
+    file.seek(info.header_offset)
+    header = LOCAL_HEADER.unpack(file.read(LOCAL_HEADER.size))
+    file.seek(header[-2] + header[-1], 1)  # Skip the file name and extra field
+    return file.read(info.compress_size)
+
+class RawZipWriter:
+    """Write a zip file from members that are either copied still compressed or deflated anew."""
+
+    def __init__(self, file):
+        self.file = file
+        self.central_directory = []
+
+    def add(self, info, data, compress_type, crc, file_size):
+        """Append a member whose stored bytes are data."""
+        if max(self.file.tell(), len(data), file_size) >= 0xFFFFFFFF:
+            raise ValueError(f"{info.filename}: zip64 members are not supported")
+
+        name = info.filename.encode('utf-8')
+        flags = (info.flag_bits & ~DATA_DESCRIPTOR_FLAG) | (0x800 if not name.isascii() else 0)
+        time, date = dos_date_time(info.date_time)
+        offset = self.file.tell()
+        self.file.write(LOCAL_HEADER.pack(0x04034b50, 20, flags, compress_type, time, date, crc, len(data),
+                                          file_size, len(name), 0))
+        self.file.write(name)
+        self.file.write(data)
+        self.central_directory.append(CENTRAL_HEADER.pack(
+            0x02014b50, info.create_version, 20, flags, compress_type, time, date, crc, len(data), file_size,
+            len(name), 0, 0, 0, info.internal_attr, info.external_attr, offset) + name)
+
+    def copy(self, info, data):
+        """Append a member from its raw stored bytes, as read by read_raw_member."""
+        self.add(info, data, info.compress_type, info.CRC, info.file_size)
+
+    def deflate(self, info, data):
+        """Append a member from uncompressed data."""
+        compressor = zlib.compressobj(zlib.Z_DEFAULT_COMPRESSION, zlib.DEFLATED, -15)
+        self.add(info, compressor.compress(data) + compressor.flush(), zipfile.ZIP_DEFLATED, zlib.crc32(data),
+                 len(data))
+
+    def close(self):
+        """Write the central directory and its end record."""
+        start = self.file.tell()
+        for record in self.central_directory:
+            self.file.write(record)
+        count = len(self.central_directory)
+        self.file.write(END_OF_CENTRAL_DIRECTORY.pack(0x06054b50, 0, 0, count, count, self.file.tell() - start,
+                                                      start, 0))
+
+def rewrite_document(input_file, output_file, abbrev_dict):
+    """Replace abbreviations directly in the document, footnote, endnote, header and footer XML.
+
+    Each text part is parsed and rewritten on its own; every other zip member (and any text part
+    with nothing to replace) is copied byte for byte, still compressed, without a python-docx
+    round trip. input_file is a path or a binary file object. The output is written to a
+    temporary file and moved into place, so output_file may be the input path itself.
+    """
+    replacer = AbbreviationReplacer(abbrev_dict)
+    output_dir = os.path.dirname(os.path.abspath(output_file))
+    descriptor, temporary_path = tempfile.mkstemp(suffix='.docx', dir=output_dir)
+
+    try:
+        with contextlib.ExitStack() as stack:
+            source = input_file
+            if isinstance(input_file, (str, os.PathLike)):
+                source = stack.enter_context(open(input_file, 'rb'))
+            docx_in = stack.enter_context(zipfile.ZipFile(source, 'r'))
+            writer = RawZipWriter(stack.enter_context(os.fdopen(descriptor, 'wb')))
+
+            for item in docx_in.infolist():
+                data = None
+                if REWRITTEN_PARTS.fullmatch(item.filename):
+                    data = rewrite_xml_part(docx_in.read(item.filename), replacer)
+                if data is not None:
+                    writer.deflate(item, data)
+                else:
+                    writer.copy(item, read_raw_member(source, item))
+            writer.close()
+
+        # mkstemp creates the file private to the user; give it the permissions of a new file
+        umask = os.umask(0)
+        os.umask(umask)
+        os.chmod(temporary_path, 0o666 & ~umask)
+        os.replace(temporary_path, output_file)
+    except BaseException:
+        if os.path.exists(temporary_path):
+            os.remove(temporary_path)
+        raise
+
 # Abbreviation replacements
 abbrev_dict = {
     "Matt": "Mt.",
@@ -123,4 +305,5 @@ abbrev_dict = {
 }
 
 # Run the processing and save to a new file
-process_document("Dissertation.docx", "New_Dissertation.docx", abbrev_dict)
+if __name__ == "__main__":
+    rewrite_document("Dissertation.docx", "New_Dissertation.docx", abbrev_dict)
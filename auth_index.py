@@ -1,104 +1,304 @@
+import os
 import re
-import pdfplumber
+from bibliography import Bibliography
+from index_db import document_name
+from metrics import RunMetrics, peak_memory_mb
+from name_index import NameIndex
 
-def extract_bibliography_from_pdf(file_path):
+# pypdfium2, numpy (through layout) and the PDF extraction modules are imported where they are
+# used, so the heading checks, the bibliography search and the name matching load in milliseconds
+
+BIBLIOGRAPHY_MARKER = "BIBLIOGRAPHY START"
+BIBLIOGRAPHY_HEADINGS = ("BIBLIOGRAPHY", "WORKS CITED", "REFERENCES", "SELECT BIBLIOGRAPHY")
+BACK_MATTER_HEADINGS = ("INDEX", "INDICES", "INDEXES")
+
+# A page number at either end of a running head ("BIBLIOGRAPHY 247", "247 Bibliography")
+FOLIO = re.compile(r'^\d{1,4}\s+|\s+\d{1,4}$')
+
+# A contents entry: a title followed by dot leaders and/or a page number
+CONTENTS_ENTRY = re.compile(r'.*\S(?:\s*(?:\.\s*){2,}|\s*…\s*|\s+)(?:\d{1,4}|[ivxlc]+)', re.IGNORECASE)
+
+def is_bibliography_heading(line):
+    """Check whether a line is the bibliography marker, a bibliography heading or its running head."""
+    line = FOLIO.sub('', line.strip()).upper()
+    return BIBLIOGRAPHY_MARKER in line or line in BIBLIOGRAPHY_HEADINGS
+
+def is_back_matter_heading(line):
+    """Check whether a line starts the back matter that follows the bibliography."""
+    line = FOLIO.sub('', line.strip()).upper()
+    return line in BACK_MATTER_HEADINGS or line.startswith("INDEX OF ")
+
+def is_contents_page(lines):
+    """Check whether a page looks like a table of contents: most lines end in dot leaders or a page number."""
+    lines = [line.strip() for line in lines if line.strip()]
+    return len(lines) >= 3 and sum(bool(CONTENTS_ENTRY.fullmatch(line)) for line in lines) > len(lines) / 2
+
+def locate_bibliography_in_outline(pdf):
+    """Find the bibliography's page range from the PDF's bookmarks, if it has any."""
+    bookmarks = []
+    for bookmark in pdf.get_toc():
+        dest = bookmark.get_dest()
+        page_index = dest.get_index() if dest is not None else None
+        if page_index is not None:
+            bookmarks.append((bookmark.level, bookmark.get_title(), page_index))
+
+    for i, (level, title, first_page) in enumerate(bookmarks):
+        if is_bibliography_heading(title):
+            # The bibliography runs until the next bookmark at the same or a higher level
+            following = [page_index for next_level, _, page_index in bookmarks[i + 1:]
+                         if next_level <= level and page_index > first_page]
+            last_page = following[0] - 1 if following else len(pdf) - 1
+            return first_page, last_page
+
+    return None
+
+def plain_page_texts(pdf):
+    """Return the plain text of each page of a pdfium document."""
+    page_texts = []
+    for page_index in range(len(pdf)):
+        page = pdf[page_index]
+        text_page = page.get_textpage()
+        page_texts.append(text_page.get_text_bounded())
+        text_page.close()
+        page.close()
+    return page_texts
+
+def locate_bibliography_in_text(pdf):
+    """Find the bibliography's page range by searching each page's plain text."""
+    return locate_bibliography_in_pages(plain_page_texts(pdf))
+
+def locate_bibliography_in_pages(page_texts):
+    """Find the bibliography's (first, last) page indices in the pages' plain text, or None.
+
+    An explicit marker wins. Otherwise the bibliography starts where the last run of pages with a
+    bibliography heading or running head starts, leaving out contents pages that merely list it.
+    A numbered running head may be printed on recto pages only, so one-page gaps before it are
+    allowed. It ends before the next back matter heading, or with the run of running heads.
+    """
+    page_lines = [text.splitlines() for text in page_texts]
+
+    first_page = next((i for i, lines in enumerate(page_lines)
+                       if any(BIBLIOGRAPHY_MARKER in line for line in lines)), None)
+    run_end = None
+    if first_page is None:
+        heading_pages = [i for i, lines in enumerate(page_lines)
+                         if any(is_bibliography_heading(line) for line in lines) and not is_contents_page(lines)]
+        if not heading_pages:
+            return None
+
+        # Pages whose heading is a running head with a page number, which may be printed on
+        # recto pages only and so leave a one-page gap between heading pages
+        running_heads = {i for i in heading_pages
+                         if any(FOLIO.search(line.strip()) and is_bibliography_heading(line) for line in page_lines[i])}
+
+        # Walk back from the last heading page to where its run of running heads starts
+        run_end = first_page = heading_pages[-1]
+        alternating = False
+        while first_page - 1 in heading_pages or (first_page in running_heads and first_page - 2 in heading_pages):
+            alternating = alternating or first_page - 1 not in heading_pages
+            first_page -= 1 if first_page - 1 in heading_pages else 2
+
+    last_page = next((i - 1 for i in range(first_page + 1, len(page_lines))
+                      if any(is_back_matter_heading(line) for line in page_lines[i])), len(page_lines) - 1)
+    if run_end is not None and run_end > first_page:
+        last_page = min(last_page, run_end + 1 if alternating else run_end)
+    return first_page, last_page
+
+def locate_bibliography(file_path, pdf=None, page_texts=None):
+    """Find the (first, last) page indices of the bibliography without char-level parsing.
+
+    Uses the PDF outline when it has a bibliography bookmark, and otherwise a plain text search
+    of each page with pdfium; pdf is the file already open with pdfium and page_texts its
+    plain_page_texts, when the caller has them. Returns None when neither finds the bibliography.
+    """
+    if pdf is None:
+        import pypdfium2 as pdfium
+
+        pdf = pdfium.PdfDocument(file_path)
+        try:
+            return locate_bibliography(file_path, pdf, page_texts)
+        finally:
+            pdf.close()
+
+    if page_texts is None:
+        return locate_bibliography_in_outline(pdf) or locate_bibliography_in_text(pdf)
+    return locate_bibliography_in_outline(pdf) or locate_bibliography_in_pages(page_texts)
+
+def extract_bibliography_from_pdf(file_path, workers=1, cache=None, metrics=None):
     """Extract bibliography entries from the PDF using hanging indent positions."""
-    bibliography_entries = []
-    
-    with pdfplumber.open(file_path) as pdf:
-        bibliography_started = False
-        current_entry = ""
+    from pdf_pages import extract_pages
 
-        for page in pdf.pages:
-            char_data = page.chars  # Extract each character with position information
-            current_line = ""
-            previous_x = None
+    if metrics is None:
+        metrics = RunMetrics()
 
-            print(f"\n--- Processing Page {page.page_number} ---")
+    with metrics.stage('locate_bibliography'):
+        page_range = locate_bibliography(file_path)
 
-            for char in char_data:
-                char_text = char['text']
-                char_x = char['x0']  # x-coordinate
-                char_y = char['top']  # y-coordinate
+    with metrics.stage('extract_bibliography_pages'):
+        if page_range is None:
+            # Fall back to looking for the marker on every page
+            pages = extract_pages(file_path, workers=workers, chars=True, cache=cache)
+        else:
+            first_page, last_page = page_range
+            pages = extract_pages(file_path, range(first_page, last_page + 1), workers=workers, chars=True,
+                                  cache=cache)
 
-                # Debugging output to show x-coordinate and y-coordinate for each character
-                print(f"Character: '{char_text}' at (x: {char_x}, y: {char_y})")
+    with metrics.stage('parse_bibliography'):
+        bibliography_entries = extract_bibliography_from_pages(pages, located=page_range is not None)
 
-                # Check if "BIBLIOGRAPHY START" has been found, trigger bibliography collection
-                if "BIBLIOGRAPHY START" in char_text:
-                    bibliography_started = True
-                
-                if bibliography_started:
-                    # Check x-coordinate to identify first line (hanging indent) or continuation line
-                    if char_x == 108.05:  # First line of a new entry
-                        if current_entry.strip():  # If there's content in the current entry, store it
-                            bibliography_entries.append(current_entry.strip())
-                        current_entry = current_line.strip()  # Start a new entry
-                    elif char_x >= 144.05:  # Continuation line (indented)
-                        current_entry += " " + current_line.strip()  # Append continuation line to current entry
-
-                    current_line = char_text  # Build the current line
-                    previous_x = char_x
-
-            # Add any remaining entry after the loop
-            if current_entry.strip():
-                bibliography_entries.append(current_entry.strip())
-
-    print("\nExtracted Bibliography Entries:")
-    for i, entry in enumerate(bibliography_entries):
-        print(f"{i + 1}. {entry}")
-    
+    metrics.count('bibliography_pages', len(pages))
+    metrics.count('bibliography_entries', len(bibliography_entries))
     return bibliography_entries
 
-def extract_last_names(entries):
-    """Extract last names from bibliography entries."""
-    last_names = []
-    
-    for entry in entries:
-        # Use regex to capture last names before commas
-        match = re.match(r'([^_\n,]+), ', entry)
-        if match:
-            last_name = match.group(1).strip()
-            last_names.append(last_name)
-    
-    return last_names
+def extract_bibliography_from_pages(pages, located=False):
+    """Extract bibliography entries from PageData with char arrays.
 
-def search_pdf_for_last_names(file_path, last_names):
-    """Search the PDF for each last name and log the page number where it is found."""
+    located means the pages are the bibliography's located page range, so the entries start on
+    the first page even without a heading line.
+    """
+    from layout import hanging_indent_entries, page_lines
+
+    bibliography_pages = []
+    bibliography_started = False
+
+    for page in pages:
+        # Whole lines with their starting x-coordinate, built from the page's characters
+        lines = page_lines(page.chars)
+
+        # Skip everything up to the "BIBLIOGRAPHY START" marker or the bibliography heading
+        if not bibliography_started:
+            for i, (_, text) in enumerate(lines):
+                if is_bibliography_heading(text):
+                    bibliography_started = True
+                    lines = lines[i + 1:]
+                    break
+            else:
+                bibliography_started = located
+
+        if bibliography_started:
+            # Running heads repeat the heading on every page and are not part of any entry
+            bibliography_pages.append([line for line in lines if not is_bibliography_heading(line[1])])
+
+    # A line at the page's left margin starts an entry; one at the hanging indent continues it
+    return hanging_indent_entries(bibliography_pages)
+
+def load_bibliography(file_path, workers=1, cache=None, bibliography_path=None, metrics=None):
+    """Return the PDF's parsed Bibliography, loading it from bibliography_path when it is up to date.
+
+    Otherwise the entries are extracted from the PDF, parsed, and saved to bibliography_path (when
+    given), so later runs and the citation checker can load them without touching the PDF.
+    """
+    if (bibliography_path is not None and os.path.exists(bibliography_path)
+            and os.path.getmtime(bibliography_path) >= os.path.getmtime(file_path)):
+        return Bibliography.load(bibliography_path)
+
+    bibliography = Bibliography.from_texts(extract_bibliography_from_pdf(file_path, workers, cache, metrics))
+    if bibliography_path is not None:
+        bibliography.save(bibliography_path)
+    return bibliography
+
+def search_text_for_last_names(pages, last_names, metrics=None):
+    """Search (page index, text) pairs for the last names, scanning each page once.
+
+    Names are matched through their normalized variants, so "Bauckham's", "Kasemann" for
+    "Käsemann" and "Horst" for "van der Horst" are all found.
+    """
+    matcher = NameIndex(last_names)
+    bibliography_order = {last_name: i for i, last_name in enumerate(matcher.names)}
     search_results = {}
-    
-    with pdfplumber.open(file_path) as pdf:
-        for page_num, page in enumerate(pdf.pages, start=1):
-            text = page.extract_text()
-            
-            for last_name in last_names:
-                pattern = fr"\b{last_name}\b"  # Search for the exact last name
-                
-                if re.search(pattern, text):
-                    if last_name not in search_results:
-                        search_results[last_name] = []
-                    search_results[last_name].append(page_num)
+
+    for page_num, text in pages:
+        found = matcher.found_names(text)
+        if metrics is not None:
+            metrics.count('pages_searched')
+            metrics.count('author_hits', len(found))
+
+        # Keep the results in bibliography order within each page
+        for last_name in sorted(found, key=bibliography_order.__getitem__):
+            if last_name not in search_results:
+                search_results[last_name] = []
+            search_results[last_name].append(page_num)
 
     return search_results
 
-def main(file_path):
-    # Step 1: Extract bibliography entries from the PDF
-    entries = extract_bibliography_from_pdf(file_path)
+def search_pdf_for_last_names(file_path, last_names, workers=1, cache=None, stream=False, metrics=None,
+                              page_texts=None):
+    """Search the PDF for each last name and log the 0-based page indices where it is found.
+
+    When page_texts is a list, the folio lines of every page are appended to it, so the page
+    labels can be built without reading the pages again.
+    """
+    from page_labels import collect_folio_lines
+    from pdf_pages import extract_pages, iter_pages
+
+    if metrics is None:
+        metrics = RunMetrics()
+
+    if stream:
+        # Decode one page at a time so memory stays flat on very long volumes; extraction and
+        # matching are interleaved, so they are timed as one stage
+        with metrics.stage('extract_and_match_authors'):
+            pages = iter_pages(file_path)
+            if page_texts is not None:
+                pages = collect_folio_lines(pages, page_texts)
+            return search_text_for_last_names(((page.index, page.text) for page in pages), last_names, metrics)
+
+    with metrics.stage('extract_pages'):
+        pages = extract_pages(file_path, workers=workers, cache=cache)
+    if page_texts is not None:
+        page_texts.extend(page.text for page in pages)
+    with metrics.stage('match_authors'):
+        return search_text_for_last_names(((page.index, page.text) for page in pages), last_names, metrics)
+
+def main(file_path, workers=1, cache=None, stream=False, database=None, bibliography_path=None, metrics=None,
+         report_path=None):
+    from page_labels import page_labels
+
+    if metrics is None:
+        metrics = RunMetrics()
+
+    # Step 1: Extract and parse the bibliography entries from the PDF (or load them if already saved)
+    bibliography = load_bibliography(file_path, workers, cache, bibliography_path, metrics)
     
-    # Step 2: Extract last names from bibliography entries
-    last_names = extract_last_names(entries)
+    # Step 2: Take the last names of the authors (and co-authors) from the bibliography entries
+    last_names = bibliography.authors()
     
     print("\nExtracted Last Names:")
     print(last_names)
     
     # Step 3: Search the PDF for last names and get page numbers
-    search_results = search_pdf_for_last_names(file_path, last_names)
+    page_texts = []
+    search_results = search_pdf_for_last_names(file_path, last_names, workers, cache, stream, metrics, page_texts)
     
+    # Step 4: Map physical pages to the printed page numbers, from the PDF's page labels or the
+    # folios in the text just searched
+    with metrics.stage('page_labels'):
+        labels = page_labels(file_path, page_texts, cache)
+
+    # Step 5: Store the hits so they can be queried later, replacing this document's previous entries
+    if database is not None:
+        database.replace_author_hits(document_name(file_path), search_results)
+        database.replace_page_labels(document_name(file_path), labels)
+
     print("\nSearch Results:")
     for last_name, pages in search_results.items():
-        pages_str = ', '.join(map(str, pages))
+        pages_str = ', '.join(labels[page] for page in pages)
         print(f"Last Name: {last_name} found on pages: {pages_str}")
 
+    if stream and peak_memory_mb() is not None:
+        print(f"\nPeak memory: {peak_memory_mb():.1f} MB")
+
+    # Step 6: Write the run report (stage timings, counters and peak memory)
+    if report_path is not None:
+        metrics.write_report(report_path)
+        print(f"\nRun report written to {report_path}")
+
 # Example usage
-source_file = 'test.pdf'  # Replace with your actual PDF file path
-main(source_file)
+if __name__ == "__main__":
+    from page_cache import PageCache
+
+    source_file = 'test.pdf'  # Replace with your actual PDF file path
+    with PageCache() as cache:  # Shared with scrip_index, so either run warms it for the other
+        main(source_file, workers=os.cpu_count(), cache=cache,
+             bibliography_path=os.path.splitext(source_file)[0] + '.bib.json',
+             report_path=os.path.splitext(source_file)[0] + '.authors.run.json')
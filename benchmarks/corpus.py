@@ -0,0 +1,303 @@
+"""Generate synthetic manuscripts: .docx files with footnotes and PDFs with a bibliography.
+
+Run from the repository root:
+    python -m benchmarks.corpus corpus/ --volumes 3 --scale 2
+
+Each volume is a Word file (abbreviation list, body paragraphs with Scripture references, italic
+runs and quotations, footnotes with full and short citations) and a PDF of the same name
+(roman-numbered front matter, Scripture-dense body pages that mention the cited authors, then a
+hanging-indent bibliography and an index page, all with printed page numbers). Sizes grow
+linearly with scale; output depends only on the seed. FILLER and make_reference are shared with
+the per-change benchmarks.
+"""
+import argparse
+import os
+import random
+import string
+import textwrap
+import zipfile
+from xml.sax.saxutils import escape
+
+from docx import Document
+
+from LNTS_abbrev import abbrev_dict
+from page_labels import int_to_roman
+from scrip_index import books
+
+W = 'http://schemas.openxmlformats.org/wordprocessingml/2006/main'
+
+FILLER = ("the argument of the letter turns on the resurrection as the vindication of "
+          "the messiah and the renewal of the people of god in the present age").split()
+
+TITLE_WORDS = ("Paul Jesus Resurrection Theology Israel Gospel Law Faith Covenant Temple Spirit Kingdom "
+               "Messiah Scripture Wisdom Apocalyptic Judaism Letters Early Christian Origins People God "
+               "Narrative Memory Identity Worship Community Ethics Grace Righteousness Promise").split()
+
+CITIES = [("Minneapolis", "Fortress"), ("Grand Rapids", "Eerdmans"), ("Oxford", "Oxford University Press"),
+          ("Tübingen", "Mohr Siebeck"), ("Leiden", "Brill"), ("London", "SPCK")]
+
+# Base sizes at scale 1
+BASE_SIZES = {'paragraphs': 400, 'footnotes': 800, 'abbreviations': 60, 'works': 150, 'pages': 60,
+              'refs_per_page': 20}
+
+def make_surname(rng):
+    """Make a capitalized surname, sometimes with diacritics or particles."""
+    name = ''.join(rng.choices(string.ascii_lowercase, k=rng.randint(4, 9))).capitalize()
+    roll = rng.random()
+    if roll < 0.05:
+        name = f"van der {name}"
+    elif roll < 0.1:
+        name = name[:2] + 'ä' + name[3:]
+    return name
+
+def make_works(count, rng):
+    """Make cited works as (surname, initials, title, city, publisher, year)."""
+    surnames = [make_surname(rng) for _ in range(max(1, count * 2 // 3))]
+    works = []
+    for _ in range(count):
+        title = ' '.join(rng.sample(TITLE_WORDS, rng.randint(3, 7)))
+        if rng.random() < 0.5:
+            title = f"The {title}"
+        city, publisher = rng.choice(CITIES)
+        initials = ' '.join(f"{letter}." for letter in rng.sample(string.ascii_uppercase, rng.randint(1, 2)))
+        works.append((rng.choice(surnames), initials, title, city, publisher, rng.randint(1950, 2023)))
+    return works
+
+def make_abbreviations(count, rng):
+    """Make (abbreviation, expansion) pairs for the abbreviation list."""
+    abbreviations = {}
+    while len(abbreviations) < count:
+        abbreviation = ''.join(rng.choices(string.ascii_uppercase, k=rng.randint(2, 5)))
+        abbreviations[abbreviation] = ' '.join(rng.sample(TITLE_WORDS, 3))
+    return sorted(abbreviations.items())
+
+def make_reference(rng):
+    """Make a Scripture reference such as "Rom 8:1, 3" or "1 Cor 15:3–5"."""
+    book = rng.choice([rng.choice(list(books)), *rng.choice(list(books.values()))])
+    chapter = rng.randint(1, 30)
+    verse = rng.randint(1, 30)
+    verses = f"{verse}–{verse + rng.randint(1, 5)}" if rng.random() < 0.2 else str(verse)
+    if rng.random() < 0.3:
+        verses += f", {rng.randint(31, 40)}"
+    return f"{book} {chapter}:{verses}"
+
+def short_title(title):
+    words = title.split()
+    return ' '.join(words[1:3] if words[0] == 'The' else words[:2])
+
+def write_docx(path, paragraphs, footnotes):
+    """Write a Word file from paragraphs and footnotes given as lists of (text, italic) runs."""
+    doc = Document()
+    for runs in paragraphs:
+        paragraph = doc.add_paragraph()
+        for text, italic in runs:
+            run = paragraph.add_run(text)
+            run.italic = italic or None
+    doc.save(path)
+
+    notes = [f'<w:footnotes xmlns:w="{W}">'
+             '<w:footnote w:type="separator" w:id="-1"><w:p><w:r><w:separator/></w:r></w:p></w:footnote>'
+             '<w:footnote w:type="continuationSeparator" w:id="0"><w:p><w:r><w:continuationSeparator/></w:r></w:p></w:footnote>']
+    for note_id, runs in enumerate(footnotes, start=1):
+        notes.append(f'<w:footnote w:id="{note_id}"><w:p>')
+        for text, italic in runs:
+            properties = '<w:rPr><w:i/></w:rPr>' if italic else ''
+            notes.append(f'<w:r>{properties}<w:t xml:space="preserve">{escape(text)}</w:t></w:r>')
+        notes.append('</w:p></w:footnote>')
+    notes.append('</w:footnotes>')
+
+    # Add the footnotes part, with its content type and relationship, to the saved package
+    with zipfile.ZipFile(path) as docx_in:
+        members = [(item, docx_in.read(item.filename)) for item in docx_in.infolist()]
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as docx_out:
+        for item, data in members:
+            if item.filename == '[Content_Types].xml':
+                data = data.replace(b'</Types>', b'<Override PartName="/word/footnotes.xml" ContentType="application/'
+                                    b'vnd.openxmlformats-officedocument.wordprocessingml.footnotes+xml"/></Types>')
+            elif item.filename == 'word/_rels/document.xml.rels':
+                data = data.replace(b'</Relationships>', b'<Relationship Id="rIdFootnotes" Type="http://schemas.'
+                                    b'openxmlformats.org/officeDocument/2006/relationships/footnotes" '
+                                    b'Target="footnotes.xml"/></Relationships>')
+            docx_out.writestr(item.filename, data)
+        docx_out.writestr('word/footnotes.xml', ''.join(notes))
+
+def make_docx(path, rng, paragraphs=400, footnotes=800, abbreviations=60, works=150):
+    """Write a synthetic manuscript Word file and return its cited works."""
+    cited = make_works(works, rng)
+    abbreviation_list = make_abbreviations(abbreviations, rng)
+    lnts_abbreviations = list(abbrev_dict)
+
+    body = [[("LIST OF ABBREVIATIONS", False)]]
+    body += [[(f"{abbreviation}\t{expansion}", False)] for abbreviation, expansion in abbreviation_list]
+    body.append([("CHAPTER 1", False)])
+
+    used_abbreviations = [abbreviation for abbreviation, _ in abbreviation_list[:len(abbreviation_list) * 4 // 5]]
+    for _ in range(paragraphs):
+        runs = []
+        for _ in range(3):
+            runs.append((' '.join(rng.choices(FILLER, k=15)) + ' ', False))
+            reference = f"{rng.choice(lnts_abbreviations)} {rng.randint(1, 20)}:{rng.randint(1, 30)}"
+            roll = rng.random()
+            if roll < 0.1:
+                runs.append((reference, True))
+            elif roll < 0.2:
+                runs.append((f"“{reference}”", False))
+            else:
+                runs.append((reference, False))
+            if rng.random() < 0.3:
+                runs.append((f" ({rng.choice(used_abbreviations)} {rng.randint(1, 99)})", False))
+        runs.append(('.', False))
+        body.append(runs)
+
+    # The first note citing a work gives the full citation, later ones the short form; some
+    # titles are quoted articles rather than italic books
+    notes = []
+    cited_before = set()
+    for _ in range(footnotes):
+        index = rng.randrange(len(cited))
+        surname, initials, title, city, publisher, year = cited[index]
+        page = rng.randint(1, 400)
+        quoted = index % 5 == 0
+        if index not in cited_before:
+            cited_before.add(index)
+            if quoted:
+                notes.append([(f"{initials} {surname}, “{title},” JBL {rng.randint(1, 140)} ({year}): {page}.", False)])
+            else:
+                notes.append([(f"{initials} {surname}, ", False), (title, True),
+                              (f" ({city}: {publisher}, {year}), {page}.", False)])
+        elif quoted:
+            notes.append([(f"{surname}, “{short_title(title)},” {page}.", False)])
+        else:
+            notes.append([(f"{surname}, ", False), (short_title(title), True), (f", {page}.", False)])
+
+    write_docx(path, body, notes)
+    return cited
+
+def pdf_string(text):
+    """Encode text as a PDF literal string in WinAnsi (cp1252) encoding."""
+    data = text.encode('cp1252', errors='replace')
+    escaped = data.replace(b'\\', b'\\\\').replace(b'(', b'\\(').replace(b')', b'\\)')
+    return b'(' + b''.join(bytes([byte]) if byte < 128 else b'\\%03o' % byte for byte in escaped) + b')'
+
+def write_pdf(path, pages, font_size=10, page_size=(612, 792), page_labels=None):
+    """Write a PDF of text pages, each a list of (x, y, text) lines in the standard Helvetica font.
+
+    page_labels is an optional list of (first page index, style, first number) numbering ranges
+    for the /PageLabels tree, with style 'D' for arabic or 'r' for lowercase roman numerals.
+    """
+    objects = []  # Object bodies; object n is objects[n - 1]
+
+    def add(body):
+        objects.append(body)
+        return len(objects)
+
+    catalog = add(None)
+    page_tree = add(None)
+    font = add(b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>')
+
+    page_ids = []
+    for lines in pages:
+        content = b''.join(b'BT /F1 %d Tf 1 0 0 1 %.2f %.2f Tm %s Tj ET\n' % (font_size, x, y, pdf_string(text))
+                           for x, y, text in lines)
+        stream = add(b'<< /Length %d >>\nstream\n%s\nendstream' % (len(content), content))
+        page_ids.append(add(b'<< /Type /Page /Parent %d 0 R /MediaBox [0 0 %d %d] /Resources << /Font << /F1 %d 0 R >> >> '
+                            b'/Contents %d 0 R >>' % (page_tree, *page_size, font, stream)))
+
+    labels = b''
+    if page_labels:
+        labels = b' /PageLabels << /Nums [%s] >>' % b' '.join(
+            b'%d << /S /%s /St %d >>' % (page_index, style.encode('ascii'), first)
+            for page_index, style, first in page_labels)
+    objects[catalog - 1] = b'<< /Type /Catalog /Pages %d 0 R%s >>' % (page_tree, labels)
+    objects[page_tree - 1] = b'<< /Type /Pages /Kids [%s] /Count %d >>' % (
+        b' '.join(b'%d 0 R' % page_id for page_id in page_ids), len(page_ids))
+
+    with open(path, 'wb') as file:
+        file.write(b'%PDF-1.4\n')
+        offsets = []
+        for number, body in enumerate(objects, start=1):
+            offsets.append(file.tell())
+            file.write(b'%d 0 obj\n%s\nendobj\n' % (number, body))
+
+        xref = file.tell()
+        file.write(b'xref\n0 %d\n0000000000 65535 f \n' % (len(objects) + 1))
+        file.writelines(b'%010d 00000 n \n' % offset for offset in offsets)
+        file.write(b'trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (len(objects) + 1, catalog, xref))
+
+def layout_lines(paragraphs, margin=72, indent=0, hanging=0, top=720, bottom=72, leading=14, width=90):
+    """Lay paragraphs out as (x, y, text) lines over as many pages as needed.
+
+    hanging indents every line after a paragraph's first, as in a bibliography.
+    """
+    pages = [[]]
+    y = top
+    for paragraph in paragraphs:
+        for i, line in enumerate(textwrap.wrap(paragraph, width)):
+            if y < bottom:
+                pages.append([])
+                y = top
+            pages[-1].append((margin + (hanging if i else indent), y, line))
+            y -= leading
+    return pages
+
+def add_folios(pages, first, roman=False, y=40):
+    """Print a centred page number at the foot of each page, counting from first."""
+    for number, lines in enumerate(pages, start=first):
+        lines.append((300, y, int_to_roman(number) if roman else str(number)))
+    return pages
+
+def make_pdf(path, rng, pages=60, works=150, refs_per_page=20, cited=None, front_matter=4, labelled=False):
+    """Write a synthetic typeset volume: roman-numbered front matter, body pages, a hanging-indent
+    bibliography and an index, with printed folios (and a /PageLabels tree when labelled is set)."""
+    cited = cited or make_works(works, rng)
+    surnames = sorted({work[0] for work in cited})
+
+    body_pages = []
+    for _ in range(pages):
+        words = rng.choices(FILLER, k=350)
+        for _ in range(refs_per_page):
+            words.insert(rng.randrange(len(words)), f"({make_reference(rng)})")
+        for _ in range(6):
+            words.insert(rng.randrange(len(words)), rng.choice(surnames) + rng.choice(["", "'s", ","]))
+        body_pages += layout_lines([' '.join(words)])[:1]  # One page of text per body page
+
+    entries = sorted(f"{surname}, {initials} {title}. {city}: {publisher}, {year}."
+                     for surname, initials, title, city, publisher, year in cited)
+    bibliography_pages = layout_lines(["BIBLIOGRAPHY", *entries], hanging=18)
+    index_pages = layout_lines(["INDEX OF ANCIENT SOURCES", "Genesis 1:1, 12"])
+    front_pages = [[(72, 720, "CONTENTS" if i == 1 else "PREFACE")] for i in range(front_matter)]
+
+    add_folios(front_pages, 1, roman=True)
+    add_folios(body_pages + bibliography_pages + index_pages, 1)
+    page_labels = [(0, 'r', 1), (front_matter, 'D', 1)] if labelled else None
+    write_pdf(path, front_pages + body_pages + bibliography_pages + index_pages, page_labels=page_labels)
+
+def make_corpus(directory, volumes=1, scale=1, seed=0):
+    """Write volumes Word/PDF pairs into the directory and return their (docx, pdf) paths."""
+    os.makedirs(directory, exist_ok=True)
+    rng = random.Random(seed)
+    sizes = {name: max(1, int(size * scale)) for name, size in BASE_SIZES.items()}
+    sizes['refs_per_page'] = BASE_SIZES['refs_per_page']  # Density stays the same at every scale
+
+    paths = []
+    for volume in range(1, volumes + 1):
+        docx_path = os.path.join(directory, f"Volume{volume}.docx")
+        pdf_path = os.path.join(directory, f"Volume{volume}.pdf")
+        cited = make_docx(docx_path, rng, sizes['paragraphs'], sizes['footnotes'], sizes['abbreviations'], sizes['works'])
+        make_pdf(pdf_path, rng, sizes['pages'], refs_per_page=sizes['refs_per_page'], cited=cited)
+        paths.append((docx_path, pdf_path))
+    return paths
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('directory', help="directory to write the volumes to")
+    parser.add_argument('--volumes', type=int, default=1)
+    parser.add_argument('--scale', type=float, default=1, help="multiplier for the base sizes")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    for docx_path, pdf_path in make_corpus(args.directory, args.volumes, args.scale, args.seed):
+        print(f"wrote {docx_path} and {pdf_path}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""Benchmark the single-pass last name matcher against the old per-name regex loop.
+
+Run from the repository root:
+    python -m benchmarks.last_names --names 900 --pages 400
+"""
+import argparse
+import random
+import re
+import string
+import time
+
+from auth_index import search_text_for_last_names
+from benchmarks.corpus import FILLER
+
+def make_last_names(count, rng):
+    """Make unique capitalized surnames, with a few compound ones mixed in."""
+    last_names = set()
+    while len(last_names) < count:
+        name = ''.join(rng.choices(string.ascii_lowercase, k=rng.randint(4, 10))).capitalize()
+        if rng.random() < 0.05:
+            name = f"van der {name}"
+        last_names.add(name)
+    return sorted(last_names)
+
+def make_pages(page_count, last_names, rng, words_per_page=450, names_per_page=12):
+    """Make page texts of filler prose with surnames scattered through them."""
+    pages = []
+    for page_num in range(1, page_count + 1):
+        words = rng.choices(FILLER, k=words_per_page)
+        for _ in range(names_per_page):
+            words.insert(rng.randrange(len(words)), rng.choice(last_names) + rng.choice(["", "'s", ","]))
+        pages.append((page_num, ' '.join(words)))
+    return pages
+
+def per_name_search(pages, last_names):
+    """The original search loop: one regex search per last name per page."""
+    search_results = {}
+    for page_num, text in pages:
+        for last_name in last_names:
+            pattern = fr"\b{last_name}\b"
+            if re.search(pattern, text):
+                if last_name not in search_results:
+                    search_results[last_name] = []
+                search_results[last_name].append(page_num)
+    return search_results
+
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--names', type=int, default=900, help="number of bibliography last names")
+    parser.add_argument('--pages', type=int, default=400, help="number of pages of text")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    last_names = make_last_names(args.names, rng)
+    pages = make_pages(args.pages, last_names, rng)
+
+    expected, loop_time = timed(per_name_search, pages, last_names)
+    result, matcher_time = timed(search_text_for_last_names, pages, last_names)
+    assert result == expected, "single-pass matcher disagrees with the per-name loop"
+
+    print(f"{args.names} names x {args.pages} pages")
+    print(f"per-name loop:       {loop_time:8.3f} s")
+    print(f"single-pass matcher: {matcher_time:8.3f} s  ({loop_time / matcher_time:.1f}x)")
+
+if __name__ == "__main__":
+    main()
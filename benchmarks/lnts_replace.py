@@ -0,0 +1,80 @@
+"""Benchmark LNTS_abbrev.process_paragraphs against the old per-abbreviation loop.
+
+Run from the repository root:
+    python -m benchmarks.lnts_replace --paragraphs 20000
+"""
+import argparse
+import random
+import re
+import time
+
+from docx import Document
+
+from LNTS_abbrev import abbrev_dict, process_paragraphs
+from benchmarks.corpus import FILLER
+
+def make_document(paragraph_count, rng, refs_per_paragraph=3):
+    """Make a document of prose paragraphs with references, some in italic runs or quotes."""
+    doc = Document()
+    abbreviations = list(abbrev_dict)
+    for _ in range(paragraph_count):
+        paragraph = doc.add_paragraph()
+        for _ in range(refs_per_paragraph):
+            paragraph.add_run(' '.join(rng.choices(FILLER, k=12)) + ' ')
+            reference = f"{rng.choice(abbreviations)} {rng.randint(1, 20)}:{rng.randint(1, 30)}"
+            if rng.random() < 0.1:
+                paragraph.add_run(reference).italic = True
+            elif rng.random() < 0.1:
+                paragraph.add_run(f"“{reference}”")
+            else:
+                paragraph.add_run(reference)
+        paragraph.add_run('.')
+    return doc
+
+# The original implementation, rebuilding and running two regexes per abbreviation per paragraph
+def wrap_italic_in_percent(runs):
+    wrapped_text = ""
+    for run in runs:
+        if run.italic:
+            wrapped_text += f'%{run.text}%%' if run.text else ''
+        else:
+            wrapped_text += run.text if run.text else ''
+    return wrapped_text
+
+def revert_percent_to_italics(runs):
+    for run in runs:
+        if run.text and '%' in run.text:
+            run.text = re.sub(r'%(.+?)%%', r'\1', run.text)
+
+def ignore_wrapped_text(text):
+    return re.sub(r'“.+?”|%.*?%%', '', text)
+
+def old_process_paragraphs(doc, abbrev_dict):
+    for paragraph in doc.paragraphs:
+        wrapped_text = wrap_italic_in_percent(paragraph.runs)
+        safe_text = ignore_wrapped_text(wrapped_text)
+        modified = False
+        for old, new in abbrev_dict.items():
+            pattern = rf'(\b{old}\b)( \d+)'
+            if re.search(pattern, safe_text):
+                paragraph.text = re.sub(pattern, rf'{new}\2', paragraph.text)
+                modified = True
+        if modified:
+            revert_percent_to_italics(paragraph.runs)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--paragraphs', type=int, default=20000)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    for name, function in [("per-abbreviation loop", old_process_paragraphs),
+                           ("single-regex engine", process_paragraphs)]:
+        doc = make_document(args.paragraphs, random.Random(args.seed))
+        start = time.perf_counter()
+        function(doc, abbrev_dict)
+        elapsed = time.perf_counter() - start
+        print(f"{name:22s} {elapsed:8.2f} s  {args.paragraphs / elapsed:9.0f} paragraphs/s")
+
+if __name__ == "__main__":
+    main()
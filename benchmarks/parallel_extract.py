@@ -0,0 +1,35 @@
+"""Benchmark parallel page extraction on 1/2/4/8 worker processes.
+
+Run from the repository root:
+    python -m benchmarks.parallel_extract test.pdf --workers 1 2 4 8
+"""
+import argparse
+import time
+
+from pdf_pages import extract_pages
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('pdf', help="PDF file to extract")
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument('--chars', action='store_true', help="also extract char data")
+    args = parser.parse_args()
+
+    baseline = None
+    expected = None
+    for workers in args.workers:
+        start = time.perf_counter()
+        pages = extract_pages(args.pdf, workers=workers, chars=args.chars)
+        elapsed = time.perf_counter() - start
+
+        texts = [page.text for page in pages]
+        if expected is None:
+            expected = texts
+        assert texts == expected, f"{workers} workers returned different page text"
+
+        baseline = baseline or elapsed
+        print(f"{workers:2d} workers: {elapsed:8.2f} s  {len(pages) / elapsed:7.1f} pages/s  "
+              f"speedup {baseline / elapsed:4.2f}x")
+
+if __name__ == "__main__":
+    main()
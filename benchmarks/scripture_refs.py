@@ -0,0 +1,75 @@
+"""Benchmark the one-pass reference lexer against the old two-regex positional matching.
+
+Run from the repository root:
+    python -m benchmarks.scripture_refs --pages 200 --refs-per-page 60
+"""
+import argparse
+import random
+import re
+import time
+
+from benchmarks.corpus import FILLER, make_reference
+from scrip_index import ReferenceLexer, books
+
+def make_pages(page_count, refs_per_page, rng, words_per_page=300):
+    """Make Scripture-dense page texts: filler prose with references scattered through it."""
+    pages = []
+    for _ in range(page_count):
+        words = rng.choices(FILLER, k=words_per_page)
+        for _ in range(refs_per_page):
+            words.insert(rng.randrange(len(words)), f"({make_reference(rng)})")
+        pages.append(' '.join(words))
+    return pages
+
+# The original matcher: separate book and verse regexes, then a backwards scan of the page's
+# book positions for every verse and a linear scan of books for every abbreviation
+old_book_pattern = re.compile(r'\b(' + '|'.join([re.escape(book) for book in books.keys()] +
+                                                [re.escape(abbr) for abbr_list in books.values() for abbr in abbr_list]) + r')\b')
+old_verse_pattern = re.compile(r'\b\d+:\d+[–, \d]*\b')
+
+def old_get_full_book_name(match):
+    if match in books:
+        return match
+    for full_name, abbreviations in books.items():
+        if match in abbreviations:
+            return full_name
+    return None
+
+def two_regex_references(pages):
+    current_book = None
+    verse_references = []
+    for text in pages:
+        book_positions = [(match.start(), old_get_full_book_name(match.group(0)))
+                          for match in old_book_pattern.finditer(text)]
+        for verse_match in old_verse_pattern.finditer(text):
+            chapter, verses = verse_match.group(0).split(':')
+            for book_position, book_name in reversed(book_positions):
+                if book_position < verse_match.start():
+                    current_book = book_name
+                    break
+            for verse in verses.split(','):
+                verse_references.append((current_book, f"{chapter}:{verse.strip()}"))
+    return verse_references
+
+def lexer_references(pages):
+    lexer = ReferenceLexer()
+    return [(reference.book, f"{reference.chapter}:{verse}")
+            for text in pages for reference in lexer.tokens(text) for verse in reference.verses]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--pages', type=int, default=200)
+    parser.add_argument('--refs-per-page', type=int, default=60)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    pages = make_pages(args.pages, args.refs_per_page, random.Random(args.seed))
+
+    for name, function in [("two-regex matching", two_regex_references), ("one-pass lexer", lexer_references)]:
+        start = time.perf_counter()
+        references = function(pages)
+        elapsed = time.perf_counter() - start
+        print(f"{name:20s} {elapsed:8.3f} s  {len(references):7d} refs  {len(references) / elapsed:10.0f} refs/s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""Time each hot path on generated manuscripts at growing sizes and compare with stored baselines.
+
+Run from the repository root:
+    python -m benchmarks.suite --scales 1 2 4
+    python -m benchmarks.suite --scales 1 2 4 --update-baselines
+
+Each case is timed as the best of --repeat runs, with its setup (loading the document, extracting
+pages) excluded. A case slower than its baseline by more than --tolerance is reported as a
+regression and the exit status is 1. Baselines are machine-specific: refresh them with
+--update-baselines on the machine that runs the comparison.
+"""
+import argparse
+from collections import namedtuple
+import json
+import os
+import sys
+import tempfile
+import time
+
+from docx import Document
+
+import Abbreviations
+import Citations
+import LNTS_abbrev
+from auth_index import extract_bibliography_from_pdf, search_pdf_for_last_names
+from bibliography import Bibliography
+from benchmarks.corpus import make_corpus
+from pdf_pages import extract_pages
+from scrip_index import index_pages
+
+BASELINES_PATH = os.path.join(os.path.dirname(__file__), 'baselines.json')
+
+# A benchmark: setup(docx path, pdf path) returns the state shared by all repeats, prepare(state)
+# returns the arguments for one timed run, and run(*arguments) is the code being timed
+Case = namedtuple('Case', ['name', 'setup', 'prepare', 'run'])
+
+def same_arguments(state):
+    return state
+
+def abbreviation_inputs(docx_path, pdf_path):
+    abbreviations, manuscript_lines = Abbreviations.read_docx(docx_path)
+    return abbreviations, manuscript_lines, Abbreviations.read_footnotes(docx_path)
+
+def search_each_abbreviation(abbreviations, manuscript_lines, footnotes):
+    footnotes_text = ' '.join(footnotes)
+    return [Abbreviations.search_in_doc(element, manuscript_lines, footnotes_text) for element in abbreviations]
+
+def citation_inputs(docx_path, pdf_path):
+    footnotes = Citations.read_docx(docx_path)
+    return Citations.find_short_citations(footnotes), footnotes
+
+def find_each_long_citation(short_citations, footnotes):
+    return [Citations.find_long_citation(short_citation, footnotes) for short_citation in short_citations]
+
+def resolve_with_index(short_citations, footnotes):
+    return Citations.resolve_citations(footnotes)
+
+def load_document(docx_path):
+    return (Document(docx_path), LNTS_abbrev.abbrev_dict)
+
+def rewrite_inputs(docx_path, pdf_path):
+    return docx_path, os.path.join(os.path.dirname(docx_path), 'rewritten.docx'), LNTS_abbrev.abbrev_dict
+
+def page_inputs(docx_path, pdf_path):
+    return (extract_pages(pdf_path),)
+
+def last_name_inputs(docx_path, pdf_path):
+    return pdf_path, Bibliography.from_texts(extract_bibliography_from_pdf(pdf_path)).authors()
+
+CASES = [
+    Case('search_in_doc', abbreviation_inputs, same_arguments, search_each_abbreviation),
+    Case('scan_abbreviations', abbreviation_inputs, same_arguments, Abbreviations.scan_abbreviations),
+    Case('find_long_citation', citation_inputs, same_arguments, find_each_long_citation),
+    Case('resolve_citations', citation_inputs, same_arguments, resolve_with_index),
+    Case('process_paragraphs', lambda docx_path, pdf_path: docx_path, load_document, LNTS_abbrev.process_paragraphs),
+    Case('rewrite_document', rewrite_inputs, same_arguments, LNTS_abbrev.rewrite_document),
+    Case('scrip_index_pages', page_inputs, same_arguments, index_pages),
+    Case('search_pdf_for_last_names', last_name_inputs, same_arguments, search_pdf_for_last_names),
+]
+
+def time_case(case, docx_path, pdf_path, repeat):
+    """Return the best time of repeat runs of the case."""
+    state = case.setup(docx_path, pdf_path)
+    best = None
+    for _ in range(repeat):
+        arguments = case.prepare(state)
+        start = time.perf_counter()
+        case.run(*arguments)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def load_baselines(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding='utf-8') as file:
+        return json.load(file)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scales', type=float, nargs='+', default=[1, 2, 4], help="corpus size multipliers")
+    parser.add_argument('--cases', nargs='+', choices=[case.name for case in CASES],
+                        default=[case.name for case in CASES])
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--tolerance', type=float, default=1.3, help="allowed slowdown against the baseline")
+    parser.add_argument('--baselines', default=BASELINES_PATH)
+    parser.add_argument('--update-baselines', action='store_true', help="store these timings as the new baselines")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    baselines = load_baselines(args.baselines)
+    timings = {}
+    regressions = []
+
+    print(f"{'case':28s} {'scale':>5s} {'seconds':>10s} {'baseline':>10s} {'ratio':>7s}")
+    with tempfile.TemporaryDirectory() as directory:
+        for scale in args.scales:
+            (docx_path, pdf_path), = make_corpus(os.path.join(directory, f"scale{scale:g}"), 1, scale, args.seed)
+            for case in CASES:
+                if case.name not in args.cases:
+                    continue
+
+                key = f"{case.name}@{scale:g}"
+                timings[key] = elapsed = time_case(case, docx_path, pdf_path, args.repeat)
+                baseline = baselines.get(key)
+                ratio = elapsed / baseline if baseline else None
+                flag = "  REGRESSION" if ratio is not None and ratio > args.tolerance else ""
+                if flag:
+                    regressions.append(key)
+                print(f"{case.name:28s} {scale:5g} {elapsed:10.4f} "
+                      f"{baseline if baseline is not None else float('nan'):10.4f} "
+                      f"{ratio if ratio is not None else float('nan'):7.2f}{flag}")
+
+    if args.update_baselines:
+        baselines.update({key: round(elapsed, 6) for key, elapsed in timings.items()})
+        with open(args.baselines, 'w', encoding='utf-8') as file:
+            json.dump(dict(sorted(baselines.items())), file, indent=2)
+        print(f"Baselines written to {args.baselines}")
+    elif regressions:
+        print(f"{len(regressions)} regression(s): {', '.join(regressions)}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
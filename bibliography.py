@@ -0,0 +1,160 @@
+from collections import namedtuple
+import json
+import re
+import unicodedata
+
+# One parsed bibliography entry. authors holds each author's surname in bibliography order and
+# keys the normalized "surname|title" forms that footnote citations are looked up by
+BibEntry = namedtuple('BibEntry', ['authors', 'title', 'short_title', 'year', 'text', 'keys'])
+
+# Lowercase words that belong to a surname ("van der Horst", "de Jonge")
+NAME_PARTICLES = {'van', 'von', 'der', 'den', 'de', 'del', 'della', 'di', 'du', 'la', 'le', 'ten', 'ter'}
+
+# Words in the author part that are not names
+EDITOR_WORDS = {'ed', 'eds', 'trans', 'jr', 'sr'}
+
+LEADING_ARTICLES = {'a', 'an', 'the'}
+
+year_pattern = re.compile(r'\b(1[5-9]\d\d|20\d\d)\b')
+
+def normalize_key(text):
+    """Return a lookup form of a name or title: case-folded, without diacritics or punctuation."""
+    text = unicodedata.normalize('NFKD', text.casefold())
+    text = ''.join(char for char in text if not unicodedata.combining(char))
+    return ' '.join(re.findall(r'\w+', text))
+
+def surname_core(surname):
+    """Return the normalized surname without its leading particles ("van der Horst" -> "horst")."""
+    words = normalize_key(surname).split()
+    while len(words) > 1 and words[0] in NAME_PARTICLES:
+        words = words[1:]
+    return ' '.join(words)
+
+def split_authors(text):
+    """Split an entry into its author part and the rest.
+
+    The author part ends at the first ". " that is not between initials, so "Wright, N. T. The
+    Resurrection" splits after "N. T." and "Hays, Richard B. Echoes" after "Richard B." A
+    co-author's name ends with the surname, so "Michael F. Bird" is not split after "F."
+    """
+    for match in re.finditer(r'\.\s+', text):
+        preceding, following = text[:match.start()], text[match.end():]
+        if re.match(r'[A-Z]\.|,|and\b', following):
+            continue
+        co_author = ' and ' in preceding or preceding.count(',') > 1
+        if co_author and re.search(r'\b[A-Z]$', preceding):
+            continue
+        return preceding, following
+    return text, ''
+
+def author_surnames(author_part):
+    """Return the surnames in an entry's author part ("Wright, N. T., and Michael F. Bird")."""
+    names = [name.strip() for name in re.split(r',\s*(?:and\s+)?|\s+and\s+|\s*&\s*', author_part)]
+    names = [name for name in names if name and name.rstrip('.').lower() not in EDITOR_WORDS]
+    if not names:
+        return ()
+
+    # The first author is inverted ("Surname, Given"); the others are "Given Surname"
+    surnames = [names[0]]
+    for name in names[2:]:
+        words = name.split()
+        start = len(words) - 1
+        while start > 0 and words[start - 1].lower() in NAME_PARTICLES:
+            start -= 1
+        surnames.append(' '.join(words[start:]))
+    return tuple(surnames)
+
+def short_title(title):
+    """Return a Chicago-style short title: up to four words of the main title, without a leading article."""
+    words = title.split(':')[0].split()
+    if len(words) > 1 and words[0].lower() in LEADING_ARTICLES:
+        words = words[1:]
+    return ' '.join(words[:4]).rstrip(',.;')
+
+def parse_entry(text):
+    """Parse a bibliography entry such as "Wright, N. T. The Resurrection of the Son of God.
+    Minneapolis: Fortress, 2003." into a BibEntry."""
+    author_part, rest = split_authors(text.strip())
+    authors = author_surnames(author_part)
+
+    # Article and chapter titles are quoted; book titles run to the next full stop
+    quoted = re.match(r'[“"]([^”"]+)[”"]', rest)
+    if quoted:
+        title = quoted.group(1).strip().rstrip(',.')
+    else:
+        title = re.split(r'\.(?:\s|$)', rest, maxsplit=1)[0].strip()
+
+    years = year_pattern.findall(rest)
+    year = int(years[-1]) if years else None
+
+    short = short_title(title)
+    keys = []
+    for surname in authors:
+        for form in (title, short):
+            key = f'{normalize_key(surname)}|{normalize_key(form)}'
+            if key not in keys:
+                keys.append(key)
+
+    return BibEntry(authors, title, short, year, text, tuple(keys))
+
+class Bibliography:
+    """Parsed bibliography entries with hash indexes by citation key and by surname.
+
+    Built once from the entries auth_index extracts from the PDF and saved as JSON, so the
+    author indexer and the citation checker both work from the same parsed entries. Surnames
+    with particles are also indexed by their surname_core, since a citation names "van der
+    Horst" as "Horst"; a full surname key wins over a core one.
+    """
+
+    def __init__(self, entries):
+        self.entries = list(entries)
+        self.by_key = {}
+        self.by_surname = {}
+
+        for position, entry in enumerate(self.entries):
+            for key in entry.keys:
+                self.by_key.setdefault(key, position)
+            for surname in entry.authors:
+                for form in dict.fromkeys((normalize_key(surname), surname_core(surname))):
+                    self.by_surname.setdefault(form, []).append(position)
+
+        for position, entry in enumerate(self.entries):
+            for key in entry.keys:
+                surname_key, title_key = key.split('|', 1)
+                self.by_key.setdefault(f'{surname_core(surname_key)}|{title_key}', position)
+
+    @classmethod
+    def from_texts(cls, texts):
+        """Build a bibliography from the text of each entry."""
+        return cls(parse_entry(text) for text in texts)
+
+    def save(self, path):
+        with open(path, 'w', encoding='utf-8') as file:
+            json.dump([entry._asdict() for entry in self.entries], file, ensure_ascii=False, indent=1)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, encoding='utf-8') as file:
+            records = json.load(file)
+        return cls(BibEntry(tuple(record['authors']), record['title'], record['short_title'], record['year'],
+                            record['text'], tuple(record['keys'])) for record in records)
+
+    def authors(self):
+        """Return every author's surname, co-authors included, once each in bibliography order."""
+        return list(dict.fromkeys(surname for entry in self.entries for surname in entry.authors))
+
+    def lookup(self, surname, title):
+        """Return the entry cited as "Surname, Title" (a full or shortened title), or None.
+
+        An exact key is a single dict lookup; otherwise the author's own entries are checked for
+        a title that contains the given one.
+        """
+        surname_key, title_key = normalize_key(surname), normalize_key(title)
+        position = self.by_key.get(f'{surname_key}|{title_key}')
+        if position is not None:
+            return self.entries[position]
+
+        for position in self.by_surname.get(surname_key, ()):
+            if title_key and f' {title_key} ' in f' {normalize_key(self.entries[position].title)} ':
+                return self.entries[position]
+        return None
@@ -0,0 +1,114 @@
+# Define the list of books and their abbreviations, in the order the Scripture index lists them
+books = {
+    # Old Testament
+    "Genesis": ["Gen"],
+    "Exodus": ["Exod", "Ex"],
+    "Leviticus": ["Lev"],
+    "Numbers": ["Num"],
+    "Deuteronomy": ["Deut", "Deu"],
+    "Joshua": ["Josh", "Jos"],
+    "Judges": ["Judg", "Jdg"],
+    "Ruth": ["Ruth", "Ru"],
+    "1 Samuel": ["1 Sam", "1 Sa"],
+    "2 Samuel": ["2 Sam", "2 Sa"],
+    "1 Kings": ["1 Kgs", "1 Ki"],
+    "2 Kings": ["2 Kgs", "2 Ki"],
+    "1 Chronicles": ["1 Chr", "1 Ch"],
+    "2 Chronicles": ["2 Chr", "2 Ch"],
+    "Ezra": ["Ezra", "Ezr"],
+    "Nehemiah": ["Neh"],
+    "Esther": ["Est"],
+    "Job": ["Job"],
+    "Psalms": ["Ps", "Pss"],
+    "Proverbs": ["Prov", "Pr"],
+    "Ecclesiastes": ["Eccl", "Ecc"],
+    "Song of Solomon": ["Song", "Sg"],
+    "Isaiah": ["Isa", "Is"],
+    "Jeremiah": ["Jer"],
+    "Lamentations": ["Lam"],
+    "Ezekiel": ["Ezek", "Eze"],
+    "Daniel": ["Dan", "Da"],
+    "Hosea": ["Hos"],
+    "Joel": ["Joel"],
+    "Amos": ["Amos"],
+    "Obadiah": ["Obad", "Ob"],
+    "Jonah": ["Jonah", "Jon"],
+    "Micah": ["Mic"],
+    "Nahum": ["Nah"],
+    "Habakkuk": ["Hab"],
+    "Zephaniah": ["Zeph", "Zep"],
+    "Haggai": ["Hag"],
+    "Zechariah": ["Zech", "Zec"],
+    "Malachi": ["Mal"],
+    
+    # New Testament
+    "Matthew": ["Matt", "Mt"],
+    "Mark": ["Mk"],
+    "Luke": ["Lk"],
+    "John": ["Jn"],
+    "Acts": ["Acts"],
+    "Romans": ["Rom", "Ro"],
+    "1 Corinthians": ["1 Cor", "1 Co"],
+    "2 Corinthians": ["2 Cor", "2 Co"],
+    "Galatians": ["Gal"],
+    "Ephesians": ["Eph"],
+    "Philippians": ["Phil"],
+    "Colossians": ["Col"],
+    "1 Thessalonians": ["1 Thess", "1 Th"],
+    "2 Thessalonians": ["2 Thess", "2 Th"],
+    "1 Timothy": ["1 Tim", "1 Ti"],
+    "2 Timothy": ["2 Tim", "2 Ti"],
+    "Titus": ["Tit"],
+    "Philemon": ["Phlm", "Phm"],
+    "Hebrews": ["Heb"],
+    "James": ["Jas"],
+    "1 Peter": ["1 Pet", "1 Pe"],
+    "2 Peter": ["2 Pet", "2 Pe"],
+    "1 John": ["1 Jn"],
+    "2 John": ["2 Jn"],
+    "3 John": ["3 Jn"],
+    "Jude": ["Jude"],
+    "Revelation": ["Rev"],
+    
+    # Apocryphal Books (Deuterocanonical)
+    "Tobit": ["Tob"],
+    "Judith": ["Jdt"],
+    "Additions to Esther": ["Add Esth", "Add Est"],
+    "Wisdom": ["Wis"],
+    "Sirach": ["Sir", "Ecclesiasticus"],
+    "Baruch": ["Bar"],
+    "Letter of Jeremiah": ["Ep Jer"],
+    "Prayer of Azariah": ["Pr Az"],
+    "Susanna": ["Sus"],
+    "Bel and the Dragon": ["Bel"],
+    "1 Maccabees": ["1 Macc", "1 Ma"],
+    "2 Maccabees": ["2 Macc", "2 Ma"],
+    "1 Esdras": ["1 Esd"],
+    "2 Esdras": ["2 Esd"],
+    "Prayer of Manasseh": ["Pr Man"],
+    "Psalm 151": ["Ps 151"],
+    
+    # Pseudepigrapha (common texts)
+    "1 Enoch": ["1 Enoch", "1 En"],
+    "2 Enoch": ["2 Enoch", "2 En"],
+    "Jubilees": ["Jub"],
+    "3 Maccabees": ["3 Macc", "3 Ma"],
+    "4 Maccabees": ["4 Macc", "4 Ma"],
+    "2 Baruch": ["2 Bar"],
+    "4 Ezra": ["4 Ezra"],
+    "Epistle of Barnabas": ["Barn"],
+    "Testaments of the Twelve Patriarchs": ["T12P", "T12 Pat"],
+    "Ascension of Isaiah": ["Ascen. Isa."],
+}
+
+# Every full name and abbreviation mapped to its full book title; full names win, and an
+# abbreviation listed under several books belongs to the first of them
+book_lookup = {}
+for full_name, abbreviations in books.items():
+    for abbr in abbreviations:
+        book_lookup.setdefault(abbr, full_name)
+book_lookup.update({full_name: full_name for full_name in books})
+
+# Position of each book in the index, used to sort references in canonical order
+book_ordinals = {full_name: ordinal for ordinal, full_name in enumerate(books)}
+book_names = list(books)
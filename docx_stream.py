@@ -0,0 +1,114 @@
+from collections import namedtuple
+import zipfile
+from lxml import etree
+
+W = 'http://schemas.openxmlformats.org/wordprocessingml/2006/main'
+W_BODY = f'{{{W}}}body'
+W_P = f'{{{W}}}p'
+W_R = f'{{{W}}}r'
+W_T = f'{{{W}}}t'
+W_TAB = f'{{{W}}}tab'
+W_BR = f'{{{W}}}br'
+W_CR = f'{{{W}}}cr'
+W_NO_BREAK_HYPHEN = f'{{{W}}}noBreakHyphen'
+W_HYPERLINK = f'{{{W}}}hyperlink'
+W_DEL = f'{{{W}}}del'
+W_MOVE_FROM = f'{{{W}}}moveFrom'
+W_RPR = f'{{{W}}}rPr'
+W_I = f'{{{W}}}i'
+W_VAL = f'{{{W}}}val'
+W_FOOTNOTE = f'{{{W}}}footnote'
+W_ENDNOTE = f'{{{W}}}endnote'
+W_TYPE = f'{{{W}}}type'
+W_ID = f'{{{W}}}id'
+
+# Lightweight records for streamed content; runs is a tuple of Run
+Run = namedtuple('Run', ['text', 'italic'])
+Paragraph = namedtuple('Paragraph', ['index', 'text', 'runs'])
+Footnote = namedtuple('Footnote', ['id', 'text', 'runs'])
+
+# Characters that python-docx reports for non-text run content
+RUN_CONTENT = {W_TAB: '\t', W_BR: '\n', W_CR: '\n', W_NO_BREAK_HYPHEN: '-'}
+
+# Tracked-change wrappers whose runs are deleted text
+DELETED_CONTENT = frozenset({W_DEL, W_MOVE_FROM})
+
+def run_text(run):
+    """Return the text of a w:r element, with tabs and breaks as python-docx reports them."""
+    pieces = []
+    for child in run:
+        if child.tag == W_T:
+            pieces.append(child.text or '')
+        elif child.tag in RUN_CONTENT:
+            pieces.append(RUN_CONTENT[child.tag])
+    return ''.join(pieces)
+
+def is_italic(run):
+    """Check whether a w:r element is directly formatted as italic."""
+    properties = run.find(W_RPR)
+    italic = properties.find(W_I) if properties is not None else None
+    return italic is not None and italic.get(W_VAL) not in ('0', 'false', 'off')
+
+def text_runs(element, skipped=DELETED_CONTENT):
+    """Yield the w:r elements under element in document order, except those inside a skipped tag.
+
+    Runs nested in hyperlinks, insertions, smart tags, content controls, simple fields and custom
+    XML are all included; runs in deleted or moved-away tracked changes are not.
+    """
+    for run in element.iter(W_R):
+        ancestor = run.getparent()
+        while ancestor is not element and ancestor.tag not in skipped:
+            ancestor = ancestor.getparent()
+        if ancestor is element:
+            yield run
+
+def paragraph_runs(element):
+    """Return the Runs of a w:p element (or of every paragraph in a note), without deleted text."""
+    return tuple(Run(run_text(run), is_italic(run)) for run in text_runs(element))
+
+def release(element):
+    """Free a processed element and the already processed siblings before it."""
+    element.clear()
+    parent = element.getparent()
+    if parent is not None:
+        while element.getprevious() is not None:
+            del parent[0]
+
+def iter_paragraphs(docx_file):
+    """Yield a Paragraph for each body paragraph of the document, like python-docx's doc.paragraphs.
+
+    The document XML is parsed incrementally and each paragraph is freed once yielded, so memory
+    use does not grow with the length of the document.
+    """
+    with zipfile.ZipFile(docx_file, 'r') as docx_zip, docx_zip.open('word/document.xml') as part:
+        index = 0
+        for _, element in etree.iterparse(part, events=('end',), tag=W_P):
+            parent = element.getparent()
+            if parent is None or parent.tag != W_BODY:
+                continue  # Paragraphs in tables and the like are freed with their body-level ancestor
+
+            runs = paragraph_runs(element)
+            yield Paragraph(index, ''.join(run.text for run in runs), runs)
+            index += 1
+            release(element)
+
+def iter_notes(docx_file, part_name='word/footnotes.xml', tag=W_FOOTNOTE):
+    """Yield a Footnote for each real note in a notes part, skipping separator notes."""
+    with zipfile.ZipFile(docx_file, 'r') as docx_zip:
+        if part_name not in docx_zip.namelist():
+            return
+
+        with docx_zip.open(part_name) as part:
+            for _, element in etree.iterparse(part, events=('end',), tag=tag):
+                if element.get(W_TYPE) is None:  # Separators have a w:type
+                    runs = paragraph_runs(element)
+                    yield Footnote(int(element.get(W_ID)), ''.join(run.text for run in runs), runs)
+                release(element)
+
+def iter_footnotes(docx_file):
+    """Yield a Footnote for each footnote of the document."""
+    return iter_notes(docx_file, 'word/footnotes.xml', W_FOOTNOTE)
+
+def iter_endnotes(docx_file):
+    """Yield a Footnote for each endnote of the document."""
+    return iter_notes(docx_file, 'word/endnotes.xml', W_ENDNOTE)
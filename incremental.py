@@ -0,0 +1,195 @@
+"""Re-index a new version of a PDF, re-running matching only on pages that changed.
+
+    python incremental.py index.sqlite volume3.pdf
+
+Pages are fingerprinted from pdfium's plain text, which is far cheaper than pdfplumber's
+char-level parsing. A page whose fingerprint is unchanged keeps its stored hits, moved to its
+new page index if it shifted. Only new or edited pages (and pages that now follow a different
+book) are extracted with pdfplumber and matched. The stored index is patched with the difference.
+"""
+import argparse
+from collections import namedtuple
+import hashlib
+import json
+import os
+import pypdfium2 as pdfium
+from auth_index import extract_bibliography_from_pdf, locate_bibliography, plain_page_texts
+from bibliography import Bibliography
+from index_db import IndexDatabase, document_name
+from name_index import NameIndex
+from page_labels import page_labels
+from pdf_pages import extract_pages
+from scrip_index import ReferenceLexer, ReferenceStore, book_names
+
+# Hits added to and removed from the index by a re-index: Scripture hits are
+# (book ordinal, chapter, verse, page) and author hits are (author, page), with 0-based page
+# indices; labels and old_labels are the new and previous versions' printed page labels
+IndexDiff = namedtuple('IndexDiff', ['added_scripture', 'removed_scripture', 'added_authors',
+                                     'removed_authors', 'rematched_pages', 'labels', 'old_labels'])
+
+def page_fingerprints(page_texts):
+    """Return a fingerprint of each page's plain text, as extracted with pdfium."""
+    return [hashlib.sha1(text.encode('utf-8')).hexdigest() for text in page_texts]
+
+def page_scripture_hits(lexer, text):
+    """Run the lexer over one page and return its {(book ordinal, chapter, verse)} hits."""
+    store = ReferenceStore()
+    for reference in lexer.tokens(text):
+        for verse in reference.verses:
+            store.add(reference.book, reference.chapter, verse, 0)
+    return {(book, chapter, verse) for book, chapter, verse, _ in store.sorted_hits().tolist()}
+
+def current_last_names(database, name, file_path, fingerprints, page_range, workers, cache):
+    """Return the bibliography's last names, re-extracting them only if its pages at page_range changed."""
+    bibliography_pages = fingerprints[page_range[0]:page_range[1] + 1] if page_range else []
+    fingerprint = hashlib.sha1(json.dumps([page_range, bibliography_pages]).encode('utf-8')).hexdigest()
+
+    stored = database.bibliography_state(name)
+    if stored is not None and stored[0] == fingerprint:
+        return stored[1]
+
+    last_names = Bibliography.from_texts(extract_bibliography_from_pdf(file_path, workers, cache)).authors()
+    database.replace_bibliography_state(name, fingerprint, last_names)
+    return last_names
+
+def stored_candidate(previous, fingerprint, start_state, page_index):
+    """Return the stored (page index, start state, end state) of a page with this text that was scanned
+    from the same lexer state, preferring the one at the same position, or None."""
+    candidates = [candidate for candidate in previous.get(fingerprint, []) if candidate[1] == start_state]
+    candidates.sort(key=lambda candidate: candidate[0] != page_index)
+    return candidates[0] if candidates else None
+
+def shifted_pages(fingerprints, previous, texts):
+    """Return the stored pages that now start from a different lexer state, and so must be matched again.
+
+    Walks the pages with a throwaway lexer, before any of them are matched, so the pages can be
+    extracted in one batch: a reused page moves the state to its stored end state, a page in
+    texts is lexed, and a shifted page's end state is predicted from its stored pair, where a
+    component that changed was set on the page and one that did not is taken to carry over.
+    """
+    lexer = ReferenceLexer()
+    shifted = []
+    for page_index, fingerprint in enumerate(fingerprints):
+        start_state = [lexer.book, lexer.chapter]
+        candidate = stored_candidate(previous, fingerprint, start_state, page_index)
+
+        if page_index in texts:
+            for _ in lexer.tokens(texts[page_index]):
+                pass
+        elif candidate is not None:
+            lexer.book, lexer.chapter = candidate[2]
+        else:
+            shifted.append(page_index)
+            _, stored_start, stored_end = previous[fingerprint][0]
+            lexer.book, lexer.chapter = (end if end != start else current
+                                         for start, end, current in zip(stored_start, stored_end, start_state))
+    return shifted
+
+def reindex(database, file_path, workers=1, cache=None):
+    """Bring the database's entries for file_path up to date and return the IndexDiff."""
+    name = document_name(file_path)
+
+    # One pdfium pass gives the text that is fingerprinted, searched for the bibliography and
+    # read for folios
+    pdf = pdfium.PdfDocument(file_path)
+    try:
+        page_texts = plain_page_texts(pdf)
+        bibliography_range = locate_bibliography(file_path, pdf, page_texts)
+    finally:
+        pdf.close()
+    fingerprints = page_fingerprints(page_texts)
+
+    # Stored pages by fingerprint, so unchanged pages are found even if they moved
+    previous = {}
+    for page_index, fingerprint, start_state, end_state in database.page_states(name):
+        previous.setdefault(fingerprint, []).append((page_index, json.loads(start_state), json.loads(end_state)))
+
+    old_scripture = database.scripture_hits_by_page(name)
+    old_authors = database.author_hits_by_page(name)
+    old_last_names = database.bibliography_state(name)
+    last_names = current_last_names(database, name, file_path, fingerprints, bibliography_range, workers, cache)
+    authors_changed = old_last_names is None or old_last_names[1] != last_names
+    matcher = NameIndex(last_names)
+
+    # Extract the pages that have no stored counterpart in one (parallel, cached) batch; when the
+    # bibliography's names changed every page has to be matched again
+    new_pages = [i for i, fingerprint in enumerate(fingerprints) if authors_changed or fingerprint not in previous]
+    texts = {page.index: page.text for page in extract_pages(file_path, new_pages, workers=workers, cache=cache)}
+
+    # Unchanged pages that now follow a different book or chapter are matched again too; they
+    # are found before matching, so they are extracted in a second batch rather than one by one
+    shifted = shifted_pages(fingerprints, previous, texts)
+    texts.update((page.index, page.text) for page in extract_pages(file_path, shifted, workers=workers, cache=cache))
+
+    lexer = ReferenceLexer()
+    scripture = set()
+    authors = set()
+    page_states = []
+    rematched_pages = []
+
+    for page_index, fingerprint in enumerate(fingerprints):
+        start_state = [lexer.book, lexer.chapter]
+
+        # Reuse a stored page with the same text that was scanned from the same lexer state
+        candidate = stored_candidate(previous, fingerprint, start_state, page_index)
+        old_index = candidate[0] if candidate is not None else None
+
+        if old_index is None or authors_changed:
+            if page_index not in texts:
+                # Only when shifted_pages mispredicted a state that a page set to its old value
+                texts.update((page.index, page.text) for page in extract_pages(file_path, [page_index], cache=cache))
+            rematched_pages.append(page_index)
+
+        if old_index is not None:
+            scripture.update((*hit, page_index) for hit in old_scripture.get(old_index, ()))
+            lexer.book, lexer.chapter = candidate[2]
+        else:
+            scripture.update((*hit, page_index) for hit in page_scripture_hits(lexer, texts[page_index]))
+
+        if old_index is not None and not authors_changed:
+            authors.update((author, page_index) for author in old_authors.get(old_index, ()))
+        else:
+            authors.update((author, page_index) for author in matcher.found_names(texts[page_index]))
+
+        page_states.append((page_index, fingerprint, json.dumps(start_state), json.dumps([lexer.book, lexer.chapter])))
+
+    # The printed numbering can change too (pages added to the front matter), so it is rebuilt
+    old_labels = database.page_labels(name)
+    labels = page_labels(file_path, page_texts, cache)
+
+    old_scripture_hits = {(*hit, page) for page, hits in old_scripture.items() for hit in hits}
+    old_author_hits = {(author, page) for page, names in old_authors.items() for author in names}
+    diff = IndexDiff(sorted(scripture - old_scripture_hits), sorted(old_scripture_hits - scripture),
+                     sorted(authors - old_author_hits), sorted(old_author_hits - authors), rematched_pages,
+                     labels, old_labels)
+
+    database.patch_scripture_hits(name, diff.added_scripture, diff.removed_scripture)
+    database.patch_author_hits(name, diff.added_authors, diff.removed_authors)
+    database.replace_page_states(name, page_states)
+    database.replace_page_labels(name, labels)
+    return diff
+
+def page_label(labels, page):
+    """Return the printed label of a page index, or its 1-based number if there is no label for it."""
+    return labels[page] if page < len(labels) else str(page + 1)
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-index only the changed pages of a PDF.")
+    parser.add_argument('database', help="index database file")
+    parser.add_argument('pdf', help="new version of an indexed PDF")
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    with IndexDatabase(args.database) as database:
+        diff = reindex(database, args.pdf, args.workers)
+
+    print(f"Re-matched {len(diff.rematched_pages)} pages")
+    for sign, hits, labels in (("+", diff.added_scripture, diff.labels), ("-", diff.removed_scripture, diff.old_labels)):
+        for book, chapter, verse, page in hits:
+            print(f"{sign} {book_names[book]} {chapter}:{verse}, page {page_label(labels, page)}")
+    for sign, hits, labels in (("+", diff.added_authors, diff.labels), ("-", diff.removed_authors, diff.old_labels)):
+        for author, page in hits:
+            print(f"{sign} {author}, page {page_label(labels, page)}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,309 @@
+"""Persistent SQLite store of Scripture and author index hits, with a small query CLI.
+
+    python index_db.py index.sqlite scripture "Isa 53"
+    python index_db.py index.sqlite scripture "Rom 8:1–11" --document books/volume3.pdf
+    python index_db.py index.sqlite author Wright
+"""
+import argparse
+import json
+import os
+import re
+import sqlite3
+import time
+from books import book_lookup, book_names, book_ordinals
+
+# A reference to look up: a book with an optional chapter, verse or range (e.g. "Isa 53",
+# "Isa 53:4", "Isa 52:13–53:12")
+query_pattern = re.compile(r'(?P<book>.+?)(?:\s+(?P<chapter>\d+)(?::(?P<verse>\d+)'
+                           r'(?:[–-](?:(?P<end_chapter>\d+):)?(?P<end_verse>\d+))?)?)?')
+
+def parse_reference(reference):
+    """Parse a reference into (book ordinal, (first chapter, verse), (last chapter, verse)).
+
+    Missing parts widen the range, so "Isa 53" covers the whole chapter and "Isa" the whole book.
+    Raises ValueError for an unknown book.
+    """
+    match = query_pattern.fullmatch(reference.strip())
+    book = book_lookup.get(match.group('book').strip()) if match else None
+    if book is None:
+        raise ValueError(f"Unknown book in reference: {reference!r}")
+
+    chapter, verse = match.group('chapter'), match.group('verse')
+    if chapter is None:
+        return book_ordinals[book], (0, 0), (0xFFFF, 0xFFFF)
+    if verse is None:
+        return book_ordinals[book], (int(chapter), 0), (int(chapter), 0xFFFF)
+
+    end_chapter = int(match.group('end_chapter') or chapter)
+    end_verse = int(match.group('end_verse') or verse)
+    return book_ordinals[book], (int(chapter), int(verse)), (end_chapter, end_verse)
+
+def document_name(file_path):
+    """Return the name a PDF's hits are stored under: its absolute path, so volumes with the same
+    file name in different directories are kept apart."""
+    return os.path.abspath(file_path)
+
+class IndexDatabase:
+    """Scripture and author hits for any number of documents, replaceable one document at a time.
+
+    Documents are named by document_name. Hits are stored by 0-based physical page index, and
+    each document's page_labels.page_labels table maps them to printed page numbers when they
+    are looked up.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.connection = sqlite3.connect(path, timeout=30)
+        self.connection.executescript('''
+            CREATE TABLE IF NOT EXISTS documents (
+                id INTEGER PRIMARY KEY,
+                name TEXT NOT NULL UNIQUE,
+                indexed_at REAL
+            );
+            CREATE TABLE IF NOT EXISTS scripture_hits (
+                document_id INTEGER NOT NULL REFERENCES documents (id),
+                book INTEGER NOT NULL,
+                chapter INTEGER NOT NULL,
+                verse INTEGER NOT NULL,
+                page INTEGER NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS scripture_reference ON scripture_hits (book, chapter, verse);
+            CREATE INDEX IF NOT EXISTS scripture_document ON scripture_hits (document_id);
+            CREATE TABLE IF NOT EXISTS author_hits (
+                document_id INTEGER NOT NULL REFERENCES documents (id),
+                author TEXT NOT NULL COLLATE NOCASE,
+                page INTEGER NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS author_name ON author_hits (author);
+            CREATE INDEX IF NOT EXISTS author_document ON author_hits (document_id);
+            CREATE TABLE IF NOT EXISTS page_states (
+                document_id INTEGER NOT NULL REFERENCES documents (id),
+                page_index INTEGER NOT NULL,
+                fingerprint TEXT NOT NULL,
+                start_state TEXT NOT NULL,
+                end_state TEXT NOT NULL,
+                PRIMARY KEY (document_id, page_index)
+            );
+            CREATE TABLE IF NOT EXISTS page_labels (
+                document_id INTEGER NOT NULL REFERENCES documents (id),
+                page INTEGER NOT NULL,
+                label TEXT NOT NULL,
+                PRIMARY KEY (document_id, page)
+            );
+            CREATE TABLE IF NOT EXISTS bibliography_states (
+                document_id INTEGER PRIMARY KEY REFERENCES documents (id),
+                fingerprint TEXT NOT NULL,
+                last_names TEXT NOT NULL
+            );
+        ''')
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def document_id(self, name):
+        """Return the id of the named document, adding it if it is new."""
+        self.connection.execute('INSERT OR IGNORE INTO documents (name) VALUES (?)', (name,))
+        return self.connection.execute('SELECT id FROM documents WHERE name = ?', (name,)).fetchone()[0]
+
+    def forget_states(self, document_id):
+        """Delete a document's stored page and bibliography states.
+
+        A full re-index replaces the hits without them, so the states would describe an older
+        version of the PDF than the hits; incremental.reindex then starts afresh.
+        """
+        self.connection.execute('DELETE FROM page_states WHERE document_id = ?', (document_id,))
+        self.connection.execute('DELETE FROM bibliography_states WHERE document_id = ?', (document_id,))
+
+    def replace_scripture_hits(self, name, store):
+        """Replace a document's Scripture hits with those in a scrip_index.ReferenceStore."""
+        with self.connection:
+            document_id = self.document_id(name)
+            self.forget_states(document_id)
+            self.connection.execute('DELETE FROM scripture_hits WHERE document_id = ?', (document_id,))
+            self.connection.executemany('INSERT INTO scripture_hits VALUES (?, ?, ?, ?, ?)',
+                                        ((document_id, *map(int, row)) for row in store.sorted_hits()))
+            self.connection.execute('UPDATE documents SET indexed_at = ? WHERE id = ?', (time.time(), document_id))
+
+    def replace_author_hits(self, name, search_results):
+        """Replace a document's author hits with {author: [pages]} search results."""
+        with self.connection:
+            document_id = self.document_id(name)
+            self.forget_states(document_id)
+            self.connection.execute('DELETE FROM author_hits WHERE document_id = ?', (document_id,))
+            self.connection.executemany('INSERT INTO author_hits VALUES (?, ?, ?)',
+                                        ((document_id, author, page)
+                                         for author, pages in search_results.items() for page in pages))
+            self.connection.execute('UPDATE documents SET indexed_at = ? WHERE id = ?', (time.time(), document_id))
+
+    def page_labels(self, name):
+        """Return a document's printed page labels in page order (empty if none are stored)."""
+        rows = self.connection.execute('''
+            SELECT label FROM page_labels
+            JOIN documents ON documents.id = document_id WHERE documents.name = ?
+            ORDER BY page
+        ''', (name,))
+        return [label for label, in rows]
+
+    def replace_page_labels(self, name, labels):
+        """Replace a document's printed page labels, one per physical page in page order."""
+        with self.connection:
+            document_id = self.document_id(name)
+            self.connection.execute('DELETE FROM page_labels WHERE document_id = ?', (document_id,))
+            self.connection.executemany('INSERT INTO page_labels VALUES (?, ?, ?)',
+                                        ((document_id, page, label) for page, label in enumerate(labels)))
+
+    def delete_document(self, name):
+        """Remove a document and all of its hits."""
+        with self.connection:
+            row = self.connection.execute('SELECT id FROM documents WHERE name = ?', (name,)).fetchone()
+            if row:
+                self.connection.execute('DELETE FROM scripture_hits WHERE document_id = ?', row)
+                self.connection.execute('DELETE FROM author_hits WHERE document_id = ?', row)
+                self.connection.execute('DELETE FROM page_states WHERE document_id = ?', row)
+                self.connection.execute('DELETE FROM page_labels WHERE document_id = ?', row)
+                self.connection.execute('DELETE FROM bibliography_states WHERE document_id = ?', row)
+                self.connection.execute('DELETE FROM documents WHERE id = ?', row)
+
+    def scripture_hits_by_page(self, name):
+        """Return {page: {(book ordinal, chapter, verse)}} for a document's Scripture hits."""
+        hits = {}
+        rows = self.connection.execute('''
+            SELECT book, chapter, verse, page FROM scripture_hits
+            JOIN documents ON documents.id = document_id WHERE documents.name = ?
+        ''', (name,))
+        for book, chapter, verse, page in rows:
+            hits.setdefault(page, set()).add((book, chapter, verse))
+        return hits
+
+    def author_hits_by_page(self, name):
+        """Return {page: {author}} for a document's author hits."""
+        hits = {}
+        rows = self.connection.execute('''
+            SELECT author, page FROM author_hits
+            JOIN documents ON documents.id = document_id WHERE documents.name = ?
+        ''', (name,))
+        for author, page in rows:
+            hits.setdefault(page, set()).add(author)
+        return hits
+
+    def patch_scripture_hits(self, name, added, removed):
+        """Insert and delete (book ordinal, chapter, verse, page) hits of a document."""
+        with self.connection:
+            document_id = self.document_id(name)
+            self.connection.executemany(
+                'DELETE FROM scripture_hits WHERE document_id = ? AND book = ? AND chapter = ? AND verse = ? AND page = ?',
+                ((document_id, *row) for row in removed))
+            self.connection.executemany('INSERT INTO scripture_hits VALUES (?, ?, ?, ?, ?)',
+                                        ((document_id, *row) for row in added))
+            self.connection.execute('UPDATE documents SET indexed_at = ? WHERE id = ?', (time.time(), document_id))
+
+    def patch_author_hits(self, name, added, removed):
+        """Insert and delete (author, page) hits of a document."""
+        with self.connection:
+            document_id = self.document_id(name)
+            self.connection.executemany('DELETE FROM author_hits WHERE document_id = ? AND author = ? AND page = ?',
+                                        ((document_id, *row) for row in removed))
+            self.connection.executemany('INSERT INTO author_hits VALUES (?, ?, ?)',
+                                        ((document_id, *row) for row in added))
+            self.connection.execute('UPDATE documents SET indexed_at = ? WHERE id = ?', (time.time(), document_id))
+
+    def page_states(self, name):
+        """Return (page index, fingerprint, start state, end state) rows stored for a document."""
+        return self.connection.execute('''
+            SELECT page_index, fingerprint, start_state, end_state FROM page_states
+            JOIN documents ON documents.id = document_id WHERE documents.name = ?
+            ORDER BY page_index
+        ''', (name,)).fetchall()
+
+    def replace_page_states(self, name, rows):
+        """Replace a document's page states with (page index, fingerprint, start state, end state) rows."""
+        with self.connection:
+            document_id = self.document_id(name)
+            self.connection.execute('DELETE FROM page_states WHERE document_id = ?', (document_id,))
+            self.connection.executemany('INSERT INTO page_states VALUES (?, ?, ?, ?, ?)',
+                                        ((document_id, *row) for row in rows))
+
+    def bibliography_state(self, name):
+        """Return (fingerprint, last names) stored for a document's bibliography, or None."""
+        row = self.connection.execute('''
+            SELECT fingerprint, last_names FROM bibliography_states
+            JOIN documents ON documents.id = document_id WHERE documents.name = ?
+        ''', (name,)).fetchone()
+        return (row[0], json.loads(row[1])) if row else None
+
+    def replace_bibliography_state(self, name, fingerprint, last_names):
+        with self.connection:
+            document_id = self.document_id(name)
+            self.connection.execute('INSERT OR REPLACE INTO bibliography_states VALUES (?, ?, ?)',
+                                    (document_id, fingerprint, json.dumps(last_names)))
+
+    def find_scripture(self, reference, document=None):
+        """Return (document, book, chapter, verse, printed page) rows for a reference such as "Isa 53"."""
+        book, first, last = parse_reference(reference)
+        query = '''
+            SELECT documents.name, book, chapter, verse, COALESCE(label, scripture_hits.page + 1) FROM scripture_hits
+            JOIN documents ON documents.id = scripture_hits.document_id
+            LEFT JOIN page_labels ON page_labels.document_id = scripture_hits.document_id
+                AND page_labels.page = scripture_hits.page
+            WHERE book = ? AND (chapter, verse) BETWEEN (?, ?) AND (?, ?)
+        '''
+        parameters = [book, *first, *last]
+        if document is not None:
+            query += ' AND documents.name = ?'
+            parameters.append(document)
+        query += ' ORDER BY documents.name, chapter, verse, scripture_hits.page'
+
+        return [(name, book_names[book], chapter, verse, page)
+                for name, book, chapter, verse, page in self.connection.execute(query, parameters)]
+
+    def find_author(self, author, document=None):
+        """Return (document, author, printed page) rows for an author (case-insensitive)."""
+        query = '''
+            SELECT documents.name, author, COALESCE(label, author_hits.page + 1) FROM author_hits
+            JOIN documents ON documents.id = author_hits.document_id
+            LEFT JOIN page_labels ON page_labels.document_id = author_hits.document_id
+                AND page_labels.page = author_hits.page
+            WHERE author = ?
+        '''
+        parameters = [author]
+        if document is not None:
+            query += ' AND documents.name = ?'
+            parameters.append(document)
+        query += ' ORDER BY documents.name, author_hits.page'
+
+        return self.connection.execute(query, parameters).fetchall()
+
+def main():
+    parser = argparse.ArgumentParser(description="Look up Scripture references and authors in an index database.")
+    parser.add_argument('database', help="index database file")
+    parser.add_argument('kind', choices=['scripture', 'author'])
+    parser.add_argument('query', help='a reference such as "Isa 53" or "Rom 8:1–11", or an author name')
+    parser.add_argument('--document', help="only show hits from this PDF")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.database):
+        parser.error(f"no such index database: {args.database}")
+
+    document = document_name(args.document) if args.document else None
+    start = time.perf_counter()
+    with IndexDatabase(args.database) as database:
+        if args.kind == 'scripture':
+            try:
+                rows = database.find_scripture(args.query, document)
+            except ValueError as error:
+                parser.error(str(error))
+            for name, book, chapter, verse, page in rows:
+                print(f"{name}\t{book} {chapter}:{verse}\tpage {page}")
+        else:
+            for name, author, page in database.find_author(args.query, document):
+                print(f"{name}\t{author}\tpage {page}")
+    print(f"({(time.perf_counter() - start) * 1000:.1f} ms)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+import numpy as np
+
+# Position and text of every character on a page, as loaded from pdfplumber's page.chars
+CHAR_DTYPE = np.dtype([('x0', 'f4'), ('x1', 'f4'), ('top', 'f4'), ('bottom', 'f4'), ('text', 'U8')])
+
+def char_array(chars):
+    """Load pdfplumber char dicts into a structured array of positions and text."""
+    return np.fromiter(((char['x0'], char['x1'], char['top'], char['bottom'], char['text']) for char in chars),
+                       dtype=CHAR_DTYPE, count=len(chars))
+
+def line_text(line):
+    """Join the characters of one line (sorted left to right), adding spaces at word gaps."""
+    texts = line['text'].tolist()
+    if len(texts) < 2:
+        return ''.join(texts)
+
+    # A gap wider than a fifth of the line height between two glyphs is a word space
+    gaps = line['x0'][1:] - line['x1'][:-1]
+    space_width = 0.2 * float(np.median(line['bottom'] - line['top']))
+    separators = np.where(gaps > space_width, ' ', '').tolist()
+
+    return texts[0] + ''.join(separator + text for separator, text in zip(separators, texts[1:]))
+
+def page_lines(chars):
+    """Group a page's characters into lines by baseline and return (x, text) pairs top to bottom."""
+    chars = chars[np.char.strip(chars['text']) != '']  # Spacing is rebuilt from the glyph positions
+    if len(chars) == 0:
+        return []
+
+    # Characters whose baselines sit within half a line height of each other share a line,
+    # which keeps superscript footnote markers with their line
+    heights = chars['bottom'] - chars['top']
+    tolerance = max(0.5 * float(np.median(heights)), 1.0)
+    order = np.argsort(chars['bottom'], kind='stable')
+    breaks = np.flatnonzero(np.diff(chars['bottom'][order]) > tolerance) + 1
+
+    lines = []
+    for indices in np.split(order, breaks):
+        line = chars[indices]
+        line = line[np.argsort(line['x0'], kind='stable')]
+        lines.append((float(line['x0'][0]), line_text(line)))
+
+    return lines
+
+def indent_columns(line_starts, tolerance=2.0):
+    """Find the left margin and hanging-indent column from a histogram of line start positions.
+
+    Returns (margin, indent); indent is None when no second column is found. When only one
+    column has enough lines behind it, a start left of it is taken as the margin, since a page
+    can hold a single entry start (the last entry, or one after a run of continuation lines).
+    """
+    starts = np.round(np.asarray(line_starts, dtype=float), 1)
+    if len(starts) == 0:
+        return None, None
+
+    # Histogram of start positions, with neighbouring bins pooled so jitter lands in one column
+    positions, counts = np.unique(starts, return_counts=True)
+    breaks = np.flatnonzero(np.diff(positions) > tolerance) + 1
+    clusters = [(float(bins[np.argmax(bin_counts)]), int(bin_counts.sum()))
+                for bins, bin_counts in zip(np.split(positions, breaks), np.split(counts, breaks))]
+
+    # A column needs a few lines behind it; one-off starts are headings, folios and the like
+    threshold = min(max(2, int(0.1 * len(starts))), max(total for _, total in clusters))
+    columns = [position for position, total in clusters if total >= threshold]
+
+    margin = columns[0]
+    indent = columns[1] if len(columns) > 1 else None
+    if indent is None and clusters[0][0] < margin:
+        margin, indent = clusters[0][0], margin
+    return margin, indent
+
+def hanging_indent_entries(pages_lines, tolerance=2.0):
+    """Build entries from lines laid out with a hanging indent, one list of (x, text) lines per page.
+
+    A line at the left margin starts a new entry and a line at the indent column continues
+    the current one, including across page breaks. Lines in neither column are skipped. A page
+    with a single column at the previous page's margin or indent takes both columns from it, so
+    continuation lines at the top of a page are not lost.
+    """
+    entries = []
+    current_entry = ""
+    previous_columns = None, None
+
+    for lines in pages_lines:
+        margin, indent = indent_columns([x for x, _ in lines], tolerance)
+        if indent is None and previous_columns[1] is not None and any(
+                abs(margin - column) <= tolerance for column in previous_columns):
+            margin, indent = previous_columns
+        if margin is not None:
+            previous_columns = margin, indent
+
+        for x, text in lines:
+            if abs(x - margin) <= tolerance:  # First line of a new entry
+                if current_entry.strip():
+                    entries.append(current_entry.strip())
+                current_entry = text
+            elif indent is not None and abs(x - indent) <= tolerance:  # Continuation line
+                current_entry += " " + text
+
+    if current_entry.strip():
+        entries.append(current_entry.strip())
+
+    return entries
@@ -0,0 +1,154 @@
+"""Stage timers, counters and peak-memory samples for a run, written out as a JSON report.
+
+    metrics = RunMetrics(profile=True)
+    with metrics.stage('extract_pages'):
+        pages = extract_pages(file_path)
+    metrics.count('pages', len(pages))
+    metrics.write_report('run.json')
+
+Each stage records its wall time, number of calls and the highest resident memory sampled while
+it ran (by a background thread that starts afresh with each stage), so extraction cost can be told
+apart from matching cost. With profile set, cProfile runs only inside stages and the report lists
+the functions with the most cumulative time.
+"""
+from contextlib import contextmanager
+import cProfile
+import io
+import json
+import os
+import sys
+import threading
+import time
+
+try:
+    import resource
+except ImportError:  # Not on Windows
+    resource = None
+
+def peak_memory_mb():
+    """Return the peak resident memory of this process so far, in megabytes, or None where it cannot be read."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+def current_memory_mb():
+    """Return the resident memory of this process now, in megabytes, or None where /proc is not available."""
+    try:
+        with open('/proc/self/statm') as file:
+            resident_pages = int(file.read().split()[1])
+    except (OSError, IndexError, ValueError):
+        return None
+    return resident_pages * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+
+class MemorySampler:
+    """Sample the process's resident memory in a background thread, keeping the highest value.
+
+    peak is None on platforms without /proc, where memory cannot be sampled.
+    """
+
+    def __init__(self, interval=0.02):
+        self.interval = interval
+        self.peak = current_memory_mb()
+        self.stopped = threading.Event()
+        self.thread = None
+        if self.peak is not None:
+            self.thread = threading.Thread(target=self.run, name='memory-sampler', daemon=True)
+            self.thread.start()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            self.sample()
+
+    def sample(self):
+        memory = current_memory_mb()
+        if memory is not None and memory > self.peak:
+            self.peak = memory
+
+    def stop(self):
+        """Stop sampling and return the peak, including a last sample."""
+        if self.thread is not None:
+            self.stopped.set()
+            self.thread.join()
+            self.sample()
+        return self.peak
+
+class RunMetrics:
+    """Per-stage timings, named counters and peak memory for one run (or one manuscript)."""
+
+    def __init__(self, profile=False):
+        self.started_at = time.time()
+        self.start = time.perf_counter()
+        self.stages = {}
+        self.counters = {}
+        self.profiler = cProfile.Profile() if profile else None
+        self.profiling = False
+
+    @contextmanager
+    def stage(self, name):
+        """Time the enclosed block as the named stage; repeated stages add up."""
+        profiling = self.profiler is not None and not self.profiling  # Nested stages share the outer profile
+        if profiling:
+            self.profiling = True
+            self.profiler.enable()
+
+        sampler = MemorySampler()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            peak = sampler.stop()
+            if profiling:
+                self.profiler.disable()
+                self.profiling = False
+
+            stage = self.stages.setdefault(name, {'seconds': 0.0, 'calls': 0, 'peak_memory_mb': None})
+            stage['seconds'] += elapsed
+            stage['calls'] += 1
+            if peak is not None:
+                stage['peak_memory_mb'] = max(peak, stage['peak_memory_mb'] or 0.0)
+
+    def count(self, name, amount=1):
+        """Add to a named counter (pages, footnotes, matches, ...)."""
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def profile_summary(self, limit=25):
+        """Return the profiled functions with the most cumulative time, as report rows."""
+        if self.profiler is None:
+            return []
+
+        import pstats  # Only needed when profiling, and slow to import
+        stats = pstats.Stats(self.profiler, stream=io.StringIO())
+        rows = []
+        for (file_name, line, function), (_, calls, own_time, cumulative, _) in stats.stats.items():
+            rows.append({'function': f"{file_name}:{line}({function})", 'calls': calls,
+                         'own_seconds': round(own_time, 6), 'cumulative_seconds': round(cumulative, 6)})
+        rows.sort(key=lambda row: row['cumulative_seconds'], reverse=True)
+        return rows[:limit]
+
+    def report(self):
+        """Return the run report as a JSON-serializable dict."""
+        report = {
+            'started_at': self.started_at,
+            'seconds': round(time.perf_counter() - self.start, 6),
+            'peak_memory_mb': round(peak_memory_mb(), 1) if resource is not None else None,
+            'stages': {name: {'seconds': round(stage['seconds'], 6), 'calls': stage['calls'],
+                              'peak_memory_mb': (round(stage['peak_memory_mb'], 1)
+                                                 if stage['peak_memory_mb'] is not None else None)}
+                       for name, stage in self.stages.items()},
+            'counters': dict(self.counters),
+        }
+        if self.profiler is not None:
+            report['profile'] = self.profile_summary()
+        return report
+
+    def dump_profile(self, path):
+        """Save the raw cProfile data, for snakeviz or pstats."""
+        if self.profiler is not None:
+            self.profiler.dump_stats(path)
+
+    def write_report(self, path):
+        """Write the run report as JSON."""
+        with open(path, 'w', encoding='utf-8') as file:
+            json.dump(self.report(), file, indent=2)
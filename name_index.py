@@ -0,0 +1,68 @@
+import re
+import unicodedata
+from bibliography import NAME_PARTICLES, normalize_key, surname_core
+
+# A word with any apostrophe suffix attached ("Bauckham's", "Jesus’", "O'Neill")
+word_pattern = re.compile(r"\w+(?:['’]\w*)*")
+
+# Possessive endings stripped from a normalized word
+possessive_pattern = re.compile(r"['’](?:s)?$")
+
+def strip_diacritics(text):
+    """Remove combining marks, so "Käsemann" reads as "Kasemann"."""
+    if text.isascii():
+        return text
+    return ''.join(char for char in unicodedata.normalize('NFKD', text) if not unicodedata.combining(char))
+
+def name_variants(name):
+    """Return the normalized word sequences that refer to an author's surname.
+
+    Besides the full surname, a compound name with particles ("van der Horst") is also found
+    without them ("Horst"), and a hyphenated one ("Schüssler-Fiorenza") with a space.
+    """
+    variants = {tuple(normalize_key(name).split()), tuple(surname_core(name).split())}
+    return {variant for variant in variants if variant}
+
+class NameIndex:
+    """Variant index from normalized surname forms to the bibliography's canonical names.
+
+    A page is normalized and split into words once, and every word position is then resolved
+    with a dict lookup on its first word, so the number of names and variants adds nothing to
+    the per-page work. found_names reports the same nested hits as word_matcher.WordMatcher
+    ("Horst" inside "van der Horst" finds both names, if both are listed).
+    """
+
+    def __init__(self, names):
+        self.names = list(dict.fromkeys(names))
+        self.by_first_word = {}
+
+        for name in self.names:
+            for variant in name_variants(name):
+                self.by_first_word.setdefault(variant[0], []).append((variant, name))
+
+    def page_words(self, text):
+        """Return the page's (normalized word, capitalized) pairs, in order.
+
+        Words are case-folded without diacritics or possessive endings, and split at inner
+        apostrophes as normalize_key splits names ("O’Neill’s" gives "o", "neill").
+        """
+        words = []
+        for word in word_pattern.findall(strip_diacritics(text)):
+            capitalized = word[0].isupper()
+            words.extend((part, capitalized) for part in re.split(r"['’]", possessive_pattern.sub('', word.casefold())))
+        return words
+
+    def found_names(self, text):
+        """Return the set of canonical names whose variants occur in the text."""
+        words = self.page_words(text)
+        normalized = [word for word, _ in words]
+        found = set()
+
+        for i, (word, capitalized) in enumerate(words):
+            for variant, name in self.by_first_word.get(word, ()):
+                # A lowercase word is only a name when it is a particle ("van der Horst"), so
+                # surnames that are also common words ("Wright", "Hope") are not found in prose
+                if (capitalized or variant[0] in NAME_PARTICLES) and tuple(normalized[i:i + len(variant)]) == variant:
+                    found.add(name)
+
+        return found
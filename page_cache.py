@@ -0,0 +1,175 @@
+import hashlib
+import json
+import os
+import sqlite3
+import time
+import zlib
+import numpy as np
+from layout import CHAR_DTYPE
+from pdf_pages import PageData
+
+DEFAULT_CACHE_PATH = os.path.join(os.path.expanduser('~'), '.cache', 'indexing', 'pages.sqlite')
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+# Hashes already computed in this process, keyed by (path, modification time, size)
+_file_hashes = {}
+
+def file_hash(file_path):
+    """Return the SHA-256 hex digest of the file's content."""
+    stat = os.stat(file_path)
+    key = (os.path.abspath(file_path), stat.st_mtime_ns, stat.st_size)
+    if key not in _file_hashes:
+        digest = hashlib.sha256()
+        with open(file_path, 'rb') as file:
+            for block in iter(lambda: file.read(1 << 20), b''):
+                digest.update(block)
+        _file_hashes[key] = digest.hexdigest()
+    return _file_hashes[key]
+
+def pack_chars(chars):
+    """Serialize a char array for storage."""
+    return zlib.compress(chars.tobytes(), 1)
+
+def unpack_chars(blob):
+    """Load a char array stored by pack_chars."""
+    return np.frombuffer(zlib.decompress(blob), dtype=CHAR_DTYPE).copy()
+
+class PageCache:
+    """On-disk cache of extracted page text and char geometry, keyed by PDF content hash and page.
+
+    Because entries are keyed by content, any run on the same PDF (from either indexer) can reuse
+    them, and an edited PDF simply gets new entries. The cache is kept under max_bytes by evicting
+    the least recently used pages.
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, max_bytes=DEFAULT_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        self.connection = sqlite3.connect(path, timeout=30)
+        self.connection.executescript('''
+            CREATE TABLE IF NOT EXISTS documents (
+                doc_hash TEXT PRIMARY KEY,
+                page_count INTEGER NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS pages (
+                doc_hash TEXT NOT NULL,
+                page INTEGER NOT NULL,
+                text TEXT,
+                chars BLOB,
+                size INTEGER NOT NULL,
+                last_used REAL NOT NULL,
+                PRIMARY KEY (doc_hash, page)
+            );
+            CREATE INDEX IF NOT EXISTS pages_last_used ON pages (last_used);
+            CREATE TABLE IF NOT EXISTS page_labels (
+                doc_hash TEXT PRIMARY KEY,
+                labels TEXT NOT NULL
+            );
+        ''')
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def doc_hash(self, file_path):
+        """Return the cache key of the PDF at file_path."""
+        return file_hash(file_path)
+
+    def get_page_count(self, doc_hash):
+        """Return the stored page count of a document, or None if it is not cached."""
+        row = self.connection.execute('SELECT page_count FROM documents WHERE doc_hash = ?', (doc_hash,)).fetchone()
+        return row[0] if row else None
+
+    def put_page_count(self, doc_hash, page_count):
+        with self.connection:
+            self.connection.execute('INSERT OR REPLACE INTO documents VALUES (?, ?)', (doc_hash, page_count))
+
+    def get_page_labels(self, doc_hash):
+        """Return the stored page labels of a document, or None if they are not cached."""
+        row = self.connection.execute('SELECT labels FROM page_labels WHERE doc_hash = ?', (doc_hash,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put_page_labels(self, doc_hash, labels):
+        with self.connection:
+            self.connection.execute('INSERT OR REPLACE INTO page_labels VALUES (?, ?)', (doc_hash, json.dumps(labels)))
+
+    def get_pages(self, doc_hash, page_indices, chars=False):
+        """Return {page index: PageData} for the requested pages found in the cache.
+
+        When chars is set, pages that were cached without char geometry count as missing.
+        """
+        found = {}
+        page_indices = list(page_indices)
+
+        # Stay under SQLite's limit on the number of query parameters
+        for i in range(0, len(page_indices), 500):
+            batch = page_indices[i:i + 500]
+            placeholders = ','.join('?' * len(batch))
+            rows = self.connection.execute(
+                f'SELECT page, text, chars FROM pages WHERE doc_hash = ? AND page IN ({placeholders})',
+                [doc_hash, *batch])
+            for page, text, blob in rows:
+                if chars and blob is None:
+                    continue
+                found[page] = PageData(page, text, unpack_chars(blob) if chars else None)
+
+        if found:
+            now = time.time()
+            with self.connection:
+                self.connection.executemany('UPDATE pages SET last_used = ? WHERE doc_hash = ? AND page = ?',
+                                            [(now, doc_hash, page) for page in found])
+        return found
+
+    def put_pages(self, doc_hash, pages):
+        """Store extracted pages, then evict old pages if the cache has grown too large."""
+        now = time.time()
+        rows = []
+        for page in pages:
+            blob = pack_chars(page.chars) if page.chars is not None else None
+            size = len(page.text.encode('utf-8')) + (len(blob) if blob is not None else 0)
+            rows.append((doc_hash, page.index, page.text, blob, size, now))
+
+        with self.connection:
+            self.connection.executemany('INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?, ?)', rows)
+        self.evict()
+
+    def evict(self):
+        """Delete least recently used pages until the cache fits in max_bytes."""
+        total = self.connection.execute('SELECT COALESCE(SUM(size), 0) FROM pages').fetchone()[0]
+        excess = total - self.max_bytes
+        if excess <= 0:
+            return
+
+        doomed = []
+        for doc_hash, page, size in self.connection.execute('SELECT doc_hash, page, size FROM pages ORDER BY last_used'):
+            if excess <= 0:
+                break
+            doomed.append((doc_hash, page))
+            excess -= size
+
+        with self.connection:
+            self.connection.executemany('DELETE FROM pages WHERE doc_hash = ? AND page = ?', doomed)
+
+    def invalidate(self, doc_hash=None):
+        """Drop the cached pages of one document, or of every document when doc_hash is None."""
+        with self.connection:
+            if doc_hash is None:
+                self.connection.execute('DELETE FROM pages')
+                self.connection.execute('DELETE FROM documents')
+                self.connection.execute('DELETE FROM page_labels')
+            else:
+                self.connection.execute('DELETE FROM pages WHERE doc_hash = ?', (doc_hash,))
+                self.connection.execute('DELETE FROM documents WHERE doc_hash = ?', (doc_hash,))
+                self.connection.execute('DELETE FROM page_labels WHERE doc_hash = ?', (doc_hash,))
+
+    def invalidate_file(self, file_path):
+        """Drop the cached pages of the PDF at file_path."""
+        self.invalidate(file_hash(file_path))
@@ -0,0 +1,133 @@
+from collections import Counter
+import re
+import pypdfium2 as pdfium
+
+# A printed folio: an arabic page number or a lowercase/uppercase roman numeral
+ARABIC_FOLIO = re.compile(r'\d{1,4}')
+ROMAN_FOLIO = re.compile(r'(?=[ivxlc]+$)c{0,3}(?:xc|xl|l?x{0,3})(?:ix|iv|v?i{0,3})', re.IGNORECASE)
+
+ROMAN_NUMERALS = [(100, 'c'), (90, 'xc'), (50, 'l'), (40, 'xl'), (10, 'x'), (9, 'ix'), (5, 'v'), (4, 'iv'), (1, 'i')]
+
+# Least share of the pages with a detected folio that must agree on an offset for it to be used
+MIN_FOLIO_AGREEMENT = 0.5
+
+def int_to_roman(number):
+    """Return a lowercase roman numeral, e.g. 14 -> "xiv"."""
+    numeral = ''
+    for value, letters in ROMAN_NUMERALS:
+        while number >= value:
+            numeral += letters
+            number -= value
+    return numeral
+
+def roman_to_int(numeral):
+    """Return the value of a roman numeral, e.g. "xiv" -> 14."""
+    values = {letters: value for value, letters in ROMAN_NUMERALS if len(letters) == 1}
+    numbers = [values[char] for char in numeral.lower()]
+    return sum(-number if number < following else number
+               for number, following in zip(numbers, numbers[1:] + [0]))
+
+def read_page_labels(pdf):
+    """Return the labels from the PDF's /PageLabels tree, or None if it has none."""
+    labels = [pdf.get_page_label(page_index) for page_index in range(len(pdf))]
+    return labels if any(labels) else None
+
+def detect_folio(lines):
+    """Find a printed folio on the first or last line of a page's text.
+
+    A folio is a line that is only a number, or a number at either end of a running head
+    ("24 THE RESURRECTION", "CHAPTER TWO 25"). Returns ('arabic' or 'roman', value) or None.
+    """
+    lines = [line.strip() for line in lines if line.strip()]
+    for line in (lines[-1:] + lines[:1]) if lines else []:
+        words = line.split()
+        candidates = [words[0], words[-1]] if len(words) > 1 else words
+        for word in candidates:
+            if ARABIC_FOLIO.fullmatch(word):
+                return 'arabic', int(word)
+            if ROMAN_FOLIO.fullmatch(word) and (len(words) == 1 or len(word) > 1):  # A lone "I" heads many lines
+                return 'roman', roman_to_int(word)
+    return None
+
+def most_common_offset(folios, kind):
+    """Return the folio - page index offset most pages of this kind agree on, or None."""
+    offsets = Counter(value - page_index for page_index, (folio_kind, value) in folios.items() if folio_kind == kind)
+    if not offsets:
+        return None
+    offset, support = offsets.most_common(1)[0]
+    return offset if support >= 2 and support >= MIN_FOLIO_AGREEMENT * sum(offsets.values()) else None
+
+def folio_labels(page_texts):
+    """Build page labels from the folios printed in each page's text, or return None if there are too few.
+
+    The printed numbering is taken to be the physical page index plus the offset most detected
+    folios agree on, so pages with a missing or misread folio still get the right label. The
+    front matter (pages before page 1, or before the first arabic folio when it has roman ones)
+    is numbered in roman numerals.
+    """
+    folios = {}
+    for page_index, text in enumerate(page_texts):
+        folio = detect_folio(text.splitlines())
+        if folio is not None:
+            folios[page_index] = folio
+
+    arabic_offset = most_common_offset(folios, 'arabic')
+    if arabic_offset is None:
+        return None
+    roman_offset = most_common_offset(folios, 'roman')
+    first_arabic = min(page_index for page_index, (kind, value) in folios.items()
+                       if kind == 'arabic' and value - page_index == arabic_offset)
+
+    labels = []
+    for page_index in range(len(page_texts)):
+        if page_index >= first_arabic or (page_index + arabic_offset >= 1 and roman_offset is None):
+            labels.append(str(page_index + arabic_offset))
+        elif roman_offset is not None and page_index + roman_offset >= 1:
+            labels.append(int_to_roman(page_index + roman_offset))
+        else:
+            labels.append(int_to_roman(page_index + 1))
+    return labels
+
+def folio_lines(text):
+    """Return the first and last non-empty lines of a page's text, the only lines detect_folio reads."""
+    lines = [line for line in text.splitlines() if line.strip()]
+    return '\n'.join(lines[:1] + lines[1:][-1:])
+
+def collect_folio_lines(pages, page_texts):
+    """Pass PageData pages through, appending the folio_lines of each page's text to page_texts.
+
+    Lets a caller that streams the pages keep what page_labels needs without keeping the pages.
+    """
+    for page in pages:
+        page_texts.append(folio_lines(page.text))
+        yield page
+
+def page_labels(file_path, page_texts, cache=None, pdf=None):
+    """Return the printed page label of every physical page of the PDF, in page order.
+
+    The labels come from the PDF's /PageLabels tree when it has one, and otherwise from the
+    folios printed in page_texts, the text of every page as the caller already extracted it
+    (folio_lines of each is enough); without either, pages are numbered from 1. Only the
+    /PageLabels tree is read from the document, through pdf when the caller has it open with
+    pdfium, and with a page_cache.PageCache the table is computed once per PDF content.
+    """
+    doc_hash = cache.doc_hash(file_path) if cache is not None else None
+    labels = cache.get_page_labels(doc_hash) if cache is not None else None
+    if labels is not None:
+        return labels
+
+    if pdf is not None:
+        labels = read_page_labels(pdf)
+    else:
+        pdf = pdfium.PdfDocument(file_path)
+        try:
+            labels = read_page_labels(pdf)
+        finally:
+            pdf.close()
+
+    if labels is None:
+        labels = folio_labels(page_texts) or [str(page_index + 1) for page_index in range(len(page_texts))]
+
+    if cache is not None:
+        cache.put_page_labels(doc_hash, labels)
+    return labels
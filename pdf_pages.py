@@ -0,0 +1,141 @@
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+import queue
+import threading
+import pdfplumber
+from layout import char_array
+from metrics import peak_memory_mb  # Re-exported for the indexers
+
+# Extracted content of one PDF page; index is the 0-based physical page index and chars is
+# a layout.CHAR_DTYPE array (or None when char data was not requested)
+PageData = namedtuple('PageData', ['index', 'text', 'chars'])
+
+def page_count(file_path):
+    """Return the number of pages in the PDF."""
+    with pdfplumber.open(file_path) as pdf:
+        return len(pdf.pages)
+
+def extract_page(page, chars=False):
+    """Extract one pdfplumber page into a PageData record and release the page's caches."""
+    page_data = PageData(page.page_number - 1, page.extract_text(), char_array(page.chars) if chars else None)
+    page.close()
+    return page_data
+
+def extract_page_chunk(file_path, page_indices, char_pages=frozenset()):
+    """Open the PDF and extract the given pages, with char arrays on those in char_pages (run in a worker)."""
+    with pdfplumber.open(file_path) as pdf:
+        return [extract_page(pdf.pages[index], index in char_pages) for index in page_indices]
+
+def split_into_chunks(page_indices, workers, chunk_size=None):
+    """Split page indices into contiguous chunks, a few per worker so slow pages even out."""
+    if chunk_size is None:
+        chunk_size = max(1, -(-len(page_indices) // (workers * 4)))
+    return [page_indices[i:i + chunk_size] for i in range(0, len(page_indices), chunk_size)]
+
+def extract_pages(file_path, pages=None, workers=1, chars=False, chunk_size=None, cache=None):
+    """Extract text (and char arrays when chars is set) from the PDF's pages, in page order.
+
+    pages is an iterable of 0-based page indices and defaults to every page. chars is True for
+    char arrays on every page, or a collection of the page indices that need them, so pages with
+    and without char geometry come from one pass over the file. With more than one worker,
+    contiguous chunks of pages are extracted in separate processes, each opening the file itself,
+    and the results are merged back in page order. With a page_cache.PageCache, pages already
+    cached for this PDF's content are loaded without calling pdfplumber at all.
+    """
+    doc_hash = cache.doc_hash(file_path) if cache is not None else None
+
+    if pages is not None:
+        page_indices = list(pages)
+    else:
+        count = cache.get_page_count(doc_hash) if cache is not None else None
+        if count is None:
+            count = page_count(file_path)
+            if cache is not None:
+                cache.put_page_count(doc_hash, count)
+        page_indices = list(range(count))
+
+    char_pages = frozenset(page_indices if chars is True else chars or ())
+    cached = {}
+    if cache is not None:
+        cached = cache.get_pages(doc_hash, [index for index in page_indices if index in char_pages], chars=True)
+        cached.update(cache.get_pages(doc_hash, [index for index in page_indices if index not in char_pages]))
+    missing = [index for index in page_indices if index not in cached]
+
+    if workers <= 1 or len(missing) < 2:
+        extracted = extract_page_chunk(file_path, missing, char_pages) if missing else []
+    else:
+        chunks = split_into_chunks(missing, workers, chunk_size)
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            # map() yields chunk results in submission order, so pages come back in order
+            results = executor.map(extract_page_chunk, [file_path] * len(chunks), chunks, [char_pages] * len(chunks))
+            extracted = [page_data for chunk in results for page_data in chunk]
+
+    if cache is not None and extracted:
+        cache.put_pages(doc_hash, extracted)
+
+    extracted_by_index = {page_data.index: page_data for page_data in extracted}
+    return [cached.get(index) or extracted_by_index[index] for index in page_indices]
+
+def stream_pages(file_path, pages=None, chars=False):
+    """Extract pages one at a time, releasing each page's layout objects once it is extracted.
+
+    Only pdfplumber's public API is used: each Page is closed after extraction, which flushes
+    its parsed objects and layout caches, so only the lightweight Page stubs stay alive.
+    """
+    wanted = None if pages is None else set(pages)
+
+    with pdfplumber.open(file_path) as pdf:
+        for page in pdf.pages:
+            if wanted is None or page.page_number - 1 in wanted:
+                yield extract_page(page, chars)
+            else:
+                page.close()
+
+def iter_pages(file_path, pages=None, chars=False, prefetch=1):
+    """Yield PageData for the PDF's pages in order, with memory use independent of page count.
+
+    A background thread extracts up to prefetch pages ahead of the consumer, so the next page is
+    being decoded while the current one is matched.
+    """
+    if prefetch < 1:
+        yield from stream_pages(file_path, pages, chars)
+        return
+
+    ready = queue.Queue(maxsize=prefetch)
+    stop = threading.Event()
+    done = object()
+
+    def produce():
+        try:
+            for page_data in stream_pages(file_path, pages, chars):
+                while not stop.is_set():
+                    try:
+                        ready.put(page_data, timeout=0.1)
+                        break
+                    except queue.Full:
+                        continue
+                if stop.is_set():
+                    return
+            ready.put(done)
+        except BaseException as error:  # Re-raised in the consumer
+            ready.put(error)
+
+    producer = threading.Thread(target=produce, name='page-prefetch', daemon=True)
+    producer.start()
+    try:
+        while True:
+            item = ready.get()
+            if item is done:
+                break
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+    finally:
+        # Let the producer finish even if the consumer stopped early
+        stop.set()
+        while producer.is_alive():
+            try:
+                ready.get(timeout=0.1)
+            except queue.Empty:
+                pass
+        producer.join()
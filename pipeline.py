@@ -0,0 +1,285 @@
+"""Run the checks and indexes over a directory of manuscripts, parsing each document once.
+
+    python pipeline.py manuscripts/ --output reports/ --database index.sqlite --workers 4
+
+A manuscript is a Word file and/or a PDF with the same name (Volume3.docx, Volume3.pdf). The
+Word file is read once: its paragraphs and footnotes are passed to the abbreviation and citation
+checks, and the LNTS conversion rewrites the XML parts of the same bytes. The PDF is opened once
+and its pages are extracted in one pass for the author and Scripture indexes (the bibliography
+pages with char geometry, the rest as plain text; a citation check alone needs only the
+bibliography pages). Manuscripts are processed in parallel across a process pool, and each one's
+report, converted Word file and parsed bibliography are written to the output directory, along
+with a JSON run report of each manuscript's stage timings, counters and peak memory (and, with
+--profile, its hottest functions and a .prof file), or the error that stopped it.
+"""
+import argparse
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+import functools
+import io
+import json
+import os
+import pypdfium2 as pdfium
+import LNTS_abbrev
+from Abbreviations import scan_abbreviations, split_manuscript
+from Citations import find_bibliography_entries, resolve_citations
+from auth_index import extract_bibliography_from_pages, locate_bibliography, search_text_for_last_names
+from bibliography import Bibliography
+from docx_stream import iter_footnotes, iter_paragraphs
+from index_db import IndexDatabase, document_name
+from metrics import RunMetrics
+from page_cache import PageCache
+from page_labels import page_labels
+from pdf_pages import extract_pages
+from scrip_index import format_scripture_index, index_pages
+from spans import SpanMask
+
+STAGES = ('abbreviations', 'citations', 'lnts', 'authors', 'scripture')
+
+# A manuscript's files; docx or pdf is None when it has only the other
+Manuscript = namedtuple('Manuscript', ['name', 'docx', 'pdf'])
+
+# A Word file read once: its bytes, which the LNTS conversion rewrites, and its docx_stream
+# Paragraphs and Footnotes (empty when only the conversion runs)
+DocxContent = namedtuple('DocxContent', ['data', 'paragraphs', 'footnotes'])
+
+# A PDF extracted once: PageData for every page (with chars on the bibliography pages), the
+# bibliography's (first, last) page indices, or None if it was not located, and the printed
+# label of each page (None when only the bibliography's pages were extracted)
+PdfContent = namedtuple('PdfContent', ['pages', 'bibliography_range', 'labels'])
+
+# What one manuscript produced: report lines, the hits and page labels to store in the index
+# database, its metrics.RunMetrics report, and the error that stopped it (None if it finished)
+ManuscriptResult = namedtuple('ManuscriptResult', ['name', 'report', 'scripture', 'authors', 'labels', 'metrics',
+                                                   'error'])
+
+def find_manuscripts(directory):
+    """Pair up the .docx and .pdf files in a directory by name, in name order."""
+    files = {}
+    for file_name in sorted(os.listdir(directory)):
+        stem, extension = os.path.splitext(file_name)
+        extension = extension.lower()
+        if extension in ('.docx', '.pdf') and not file_name.startswith('~$'):  # ~$ files are Word lock files
+            files.setdefault(stem, {})[extension] = os.path.join(directory, file_name)
+
+    return [Manuscript(stem, found.get('.docx'), found.get('.pdf')) for stem, found in files.items()]
+
+def parse_docx(file_path, text=True):
+    """Read a Word file once, parsing its body paragraphs and footnotes from memory when text is set."""
+    with open(file_path, 'rb') as file:
+        data = file.read()
+    if not text:
+        return DocxContent(data, [], [])
+    return DocxContent(data, list(iter_paragraphs(io.BytesIO(data))), list(iter_footnotes(io.BytesIO(data))))
+
+def parse_pdf(file_path, cache=None, all_pages=True):
+    """Extract a PDF's pages once, with char geometry only where the bibliography is.
+
+    The PDF is opened once with pdfium, to find the bibliography, count the pages and read its
+    page labels, and the pages are extracted in a single pdfplumber pass. Without all_pages only
+    the bibliography's pages are extracted, which is all the citation check needs, and there are
+    no labels.
+    """
+    pdf = pdfium.PdfDocument(file_path)
+    try:
+        bibliography_range = locate_bibliography(file_path, pdf)
+        if bibliography_range is None:
+            # The bibliography has to be searched for on every page
+            page_indices = char_pages = range(len(pdf))
+        else:
+            first_page, last_page = bibliography_range
+            char_pages = range(first_page, last_page + 1)
+            page_indices = range(len(pdf)) if all_pages else char_pages
+        pages = extract_pages(file_path, page_indices, chars=char_pages, cache=cache)
+
+        # The folios are read from the text just extracted rather than from the PDF again
+        labels = page_labels(file_path, [page.text for page in pages], cache, pdf) if all_pages else None
+    finally:
+        pdf.close()
+    return PdfContent(pages, bibliography_range, labels)
+
+def abbreviation_stage(content):
+    """Report the listed abbreviations that are never used."""
+    abbreviations, manuscript_lines = split_manuscript(paragraph.text for paragraph in content.paragraphs)
+    usage = scan_abbreviations(abbreviations, manuscript_lines, [footnote.text for footnote in content.footnotes])
+    not_found_abbreviations = [element for element, element_usage in usage.items() if element_usage.unused]
+
+    if not not_found_abbreviations:
+        return ["All abbreviations were found."]
+    return ["Abbreviations not found:", *not_found_abbreviations]
+
+def citation_stage(content, bibliography=None):
+    """Report each short citation's long citation, and its bibliography entry when there is a bibliography."""
+    citation_dict, early_short_citations = resolve_citations([SpanMask.from_runs(footnote.runs)
+                                                              for footnote in content.footnotes])
+
+    lines = ["Citation Dictionary:"]
+    lines.extend(f"{short_citation} -> {long_citation}" for short_citation, long_citation in citation_dict.items())
+    lines.extend(f"{short_citation} used in note {short_footnote} before the full citation in note {long_footnote}"
+                 for short_citation, short_footnote, long_footnote in early_short_citations)
+
+    if bibliography is not None:
+        lines.append("Bibliography Entries:")
+        lines.extend(f"{short_citation} -> {entry.text if entry else 'Not in bibliography'}"
+                     for short_citation, entry in find_bibliography_entries(citation_dict, bibliography).items())
+    return lines
+
+def lnts_stage(name, content, output_dir):
+    """Write the LNTS-converted Word file from the bytes already read and report where it went."""
+    output_file = os.path.join(output_dir, f"{name}.LNTS.docx")
+    LNTS_abbrev.rewrite_document(io.BytesIO(content.data), output_file, LNTS_abbrev.abbrev_dict)
+    return [f"LNTS version written to {output_file}"]
+
+def author_stage(content, bibliography, metrics=None):
+    """Search the pages for every bibliography author and report the pages each is found on."""
+    search_results = search_text_for_last_names(((page.index, page.text) for page in content.pages),
+                                                bibliography.authors(), metrics)
+    lines = [f"Last Name: {last_name} found on pages: {', '.join(content.labels[page] for page in pages)}"
+             for last_name, pages in search_results.items()]
+    return search_results, lines
+
+def scripture_stage(content, metrics=None):
+    """Collect the pages' Scripture references and format the Scripture index."""
+    store = index_pages(content.pages, metrics)
+    return store, format_scripture_index(store, content.labels)
+
+def process_manuscript(manuscript, output_dir, stages=STAGES, use_cache=True, profile=False):
+    """Parse one manuscript's files once and run the requested stages on them."""
+    metrics = RunMetrics(profile)
+    report = [f"=== {manuscript.name} ==="]
+    scripture = authors = bibliography = labels = None
+
+    cache = PageCache() if use_cache and manuscript.pdf else None
+    try:
+        if manuscript.pdf and ('authors' in stages or 'scripture' in stages or 'citations' in stages):
+            # A citation check on its own needs only the bibliography's pages
+            with metrics.stage('parse_pdf'):
+                pdf_content = parse_pdf(manuscript.pdf, cache, 'authors' in stages or 'scripture' in stages)
+            metrics.count('pages', len(pdf_content.pages))
+            labels = pdf_content.labels
+
+            # The bibliography is parsed first, since the citation check also looks short citations up in it
+            with metrics.stage('parse_bibliography'):
+                bibliography_pages = [page for page in pdf_content.pages if page.chars is not None]
+                entries = extract_bibliography_from_pages(bibliography_pages,
+                                                          pdf_content.bibliography_range is not None)
+                bibliography = Bibliography.from_texts(entries)
+                bibliography.save(os.path.join(output_dir, f"{manuscript.name}.bib.json"))
+            metrics.count('bibliography_entries', len(bibliography.entries))
+
+            if 'authors' in stages:
+                with metrics.stage('authors'):
+                    authors, lines = author_stage(pdf_content, bibliography, metrics)
+                report += ["", "Author Index:", *lines]
+            if 'scripture' in stages:
+                with metrics.stage('scripture'):
+                    scripture, lines = scripture_stage(pdf_content, metrics)
+                report += ["", "Scripture Index:", *lines]
+    finally:
+        if cache is not None:
+            cache.close()
+
+    if manuscript.docx and ('abbreviations' in stages or 'citations' in stages or 'lnts' in stages):
+        with metrics.stage('parse_docx'):
+            docx_content = parse_docx(manuscript.docx, 'abbreviations' in stages or 'citations' in stages)
+        metrics.count('paragraphs', len(docx_content.paragraphs))
+        metrics.count('footnotes', len(docx_content.footnotes))
+
+        if 'abbreviations' in stages:
+            with metrics.stage('abbreviations'):
+                report += ["", *abbreviation_stage(docx_content)]
+        if 'citations' in stages:
+            with metrics.stage('citations'):
+                report += ["", *citation_stage(docx_content, bibliography)]
+        if 'lnts' in stages:
+            with metrics.stage('lnts'):
+                report += ["", *lnts_stage(manuscript.name, docx_content, output_dir)]
+
+    with open(os.path.join(output_dir, f"{manuscript.name}.report.txt"), 'w', encoding='utf-8') as file:
+        file.write('\n'.join(report) + '\n')
+    metrics.dump_profile(os.path.join(output_dir, f"{manuscript.name}.prof"))
+
+    return ManuscriptResult(manuscript.name, report, scripture, authors, labels, metrics.report(), None)
+
+def result_or_failure(manuscript, get_result):
+    """Return get_result(), or a ManuscriptResult recording the error if processing the manuscript failed."""
+    try:
+        return get_result()
+    except Exception as error:
+        message = f"{type(error).__name__}: {error}"
+        return ManuscriptResult(manuscript.name, [f"=== {manuscript.name} ===", "", f"Failed: {message}"],
+                                None, None, None, None, message)
+
+def run(directory, output_dir, stages=STAGES, workers=1, database=None, use_cache=True, profile=False):
+    """Process every manuscript in the directory, yielding a ManuscriptResult as each finishes.
+
+    Results come back in manuscript order. Each manuscript is submitted on its own, so one that
+    fails is reported in its result's error and the rest still run. The index database is
+    written from this process only, so the workers never contend for it.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    manuscripts = find_manuscripts(directory)
+    arguments = (output_dir, stages, use_cache, profile)
+
+    if workers <= 1 or len(manuscripts) < 2:
+        results = (result_or_failure(manuscript, functools.partial(process_manuscript, manuscript, *arguments))
+                   for manuscript in manuscripts)
+        yield from store_results(results, manuscripts, database)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(process_manuscript, manuscript, *arguments) for manuscript in manuscripts]
+            results = (result_or_failure(manuscript, future.result) for manuscript, future in zip(manuscripts, futures))
+            yield from store_results(results, manuscripts, database)
+
+def store_results(results, manuscripts, database):
+    """Store each result's hits and page labels under its PDF's document_name in the database (if any)."""
+    for manuscript, result in zip(manuscripts, results):
+        if database is not None and manuscript.pdf:
+            name = document_name(manuscript.pdf)
+            if result.scripture is not None:
+                database.replace_scripture_hits(name, result.scripture)
+            if result.authors is not None:
+                database.replace_author_hits(name, result.authors)
+            if result.labels is not None:
+                database.replace_page_labels(name, result.labels)
+        yield result
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the checks and indexes over a directory of manuscripts.")
+    parser.add_argument('directory', help="directory of .docx and .pdf manuscripts")
+    parser.add_argument('--output', default='reports', help="directory for reports and converted files")
+    parser.add_argument('--stages', nargs='+', choices=STAGES, default=list(STAGES))
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help="manuscripts processed in parallel")
+    parser.add_argument('--database', help="index database to store the author and Scripture hits in")
+    parser.add_argument('--no-cache', action='store_true', help="do not use the shared page cache")
+    parser.add_argument('--profile', action='store_true', help="profile each manuscript's stages with cProfile")
+    parser.add_argument('--report', help="JSON run report file (default: run_report.json in the output directory)")
+    args = parser.parse_args()
+
+    metrics = RunMetrics()
+    manuscripts = {}
+    database = IndexDatabase(args.database) if args.database else None
+    try:
+        with metrics.stage('run'):
+            for result in run(args.directory, args.output, tuple(args.stages), args.workers, database,
+                              not args.no_cache, args.profile):
+                metrics.count('manuscripts')
+                if result.error is not None:
+                    manuscripts[result.name] = {'error': result.error}
+                    metrics.count('failed_manuscripts')
+                    print(f"{result.name}: failed: {result.error}")
+                    continue
+                manuscripts[result.name] = result.metrics
+                print(f"{result.name}: report written to {os.path.join(args.output, result.name + '.report.txt')}")
+    finally:
+        if database is not None:
+            database.close()
+
+    run_report = metrics.report()
+    run_report['workers'] = args.workers
+    run_report['manuscripts'] = manuscripts
+    with open(args.report or os.path.join(args.output, 'run_report.json'), 'w', encoding='utf-8') as file:
+        json.dump(run_report, file, indent=2)
+
+if __name__ == "__main__":
+    main()
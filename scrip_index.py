@@ -1,178 +1,247 @@
-import pdfplumber
+from array import array
+from collections import namedtuple
+import functools
+import os
 import re
+from books import book_lookup, book_names, book_ordinals, books
+from index_db import document_name
+from metrics import RunMetrics, peak_memory_mb
+from word_matcher import trie_regex
+
+# numpy and the PDF extraction modules are imported where they are used, so the lexer, the
+# store and the book tables load in milliseconds
 
 ### NOTES:
-# Need to deal with verse only references in lists
 # Need to figure out how to identify the correct book name, particularly in Revelation with "John"
-# Need to organize and create final output
-
-# Define the list of books and their abbreviations
-books = {
-    # Pseudepigrapha (common texts)
-    "1 Enoch": ["1 Enoch", "1 En"],
-    "2 Enoch": ["2 Enoch", "2 En"],
-    "Jubilees": ["Jub"],
-    "3 Maccabees": ["3 Macc", "3 Ma"],
-    "4 Maccabees": ["4 Macc", "4 Ma"],
-    "2 Baruch": ["2 Bar"],
-    "4 Ezra": ["4 Ezra"],
-    "Epistle of Barnabas": ["Barn"],
-    "Testaments of the Twelve Patriarchs": ["T12P", "T12 Pat"],
-    "Ascension of Isaiah": ["Ascen. Isa."],
-
-    # Old Testament
-    "Genesis": ["Gen"],
-    "Exodus": ["Exod", "Ex"],
-    "Leviticus": ["Lev"],
-    "Numbers": ["Num"],
-    "Deuteronomy": ["Deut", "Deu"],
-    "Joshua": ["Josh", "Jos"],
-    "Judges": ["Judg", "Jdg"],
-    "Ruth": ["Ruth", "Ru"],
-    "1 Samuel": ["1 Sam", "1 Sa"],
-    "2 Samuel": ["2 Sam", "2 Sa"],
-    "1 Kings": ["1 Kgs", "1 Ki"],
-    "2 Kings": ["2 Kgs", "2 Ki"],
-    "1 Chronicles": ["1 Chr", "1 Ch"],
-    "2 Chronicles": ["2 Chr", "2 Ch"],
-    "Ezra": ["Ezra", "Ezr"],
-    "Nehemiah": ["Neh"],
-    "Esther": ["Est"],
-    "Job": ["Job"],
-    "Psalms": ["Ps", "Pss"],
-    "Proverbs": ["Prov", "Pr"],
-    "Ecclesiastes": ["Eccl", "Ecc"],
-    "Song of Solomon": ["Song", "Sg"],
-    "Isaiah": ["Isa", "Is"],
-    "Jeremiah": ["Jer"],
-    "Lamentations": ["Lam"],
-    "Ezekiel": ["Ezek", "Eze"],
-    "Daniel": ["Dan", "Da"],
-    "Hosea": ["Hos"],
-    "Joel": ["Joel"],
-    "Amos": ["Amos"],
-    "Obadiah": ["Obad", "Ob"],
-    "Jonah": ["Jonah", "Jon"],
-    "Micah": ["Mic"],
-    "Nahum": ["Nah"],
-    "Habakkuk": ["Hab"],
-    "Zephaniah": ["Zeph", "Zep"],
-    "Haggai": ["Hag"],
-    "Zechariah": ["Zech", "Zec"],
-    "Malachi": ["Mal"],
-    
-    # New Testament
-    "Matthew": ["Matt", "Mt"],
-    "Mark": ["Mk"],
-    "Luke": ["Lk"],
-    "John": ["Jn"],
-    "Acts": ["Acts"],
-    "Romans": ["Rom", "Ro"],
-    "1 Corinthians": ["1 Cor", "1 Co"],
-    "2 Corinthians": ["2 Cor", "2 Co"],
-    "Galatians": ["Gal"],
-    "Ephesians": ["Eph"],
-    "Philippians": ["Phil"],
-    "Colossians": ["Col"],
-    "1 Thessalonians": ["1 Thess", "1 Th"],
-    "2 Thessalonians": ["2 Thess", "2 Th"],
-    "1 Timothy": ["1 Tim", "1 Ti"],
-    "2 Timothy": ["2 Tim", "2 Ti"],
-    "Titus": ["Tit"],
-    "Philemon": ["Phlm", "Phm"],
-    "Hebrews": ["Heb"],
-    "James": ["Jas"],
-    "1 Peter": ["1 Pet", "1 Pe"],
-    "2 Peter": ["2 Pet", "2 Pe"],
-    "1 John": ["1 Jn"],
-    "2 John": ["2 Jn"],
-    "3 John": ["3 Jn"],
-    "Jude": ["Jude"],
-    "Revelation": ["Rev"],
-    
-    # Apocryphal Books (Deuterocanonical)
-    "Tobit": ["Tob"],
-    "Judith": ["Jdt"],
-    "Additions to Esther": ["Add Esth", "Add Est"],
-    "Wisdom": ["Wis"],
-    "Sirach": ["Sir", "Ecclesiasticus"],
-    "Baruch": ["Bar"],
-    "Letter of Jeremiah": ["Ep Jer"],
-    "Prayer of Azariah": ["Pr Az"],
-    "Susanna": ["Sus"],
-    "Bel and the Dragon": ["Bel"],
-    "1 Maccabees": ["1 Macc", "1 Ma"],
-    "2 Maccabees": ["2 Macc", "2 Ma"],
-    "1 Esdras": ["1 Esd"],
-    "2 Esdras": ["2 Esd"],
-    "Prayer of Manasseh": ["Pr Man"],
-    "Psalm 151": ["Ps 151"],
-}
-
-# A regex pattern for detecting book names (full or abbreviated forms)
-book_pattern = re.compile(r'\b(' + '|'.join([re.escape(book) for book in books.keys()] + 
-                                            [re.escape(abbr) for abbr_list in books.values() for abbr in abbr_list]) + r')\b')
-
-# A regex pattern for detecting verse references (e.g., 1:1, 3:16)
-verse_pattern = re.compile(r'\b\d+:\d+[–, \d]*\b')
-
-# Function to map any abbreviation or full name match to the full book title
-def get_full_book_name(match):
-    # Check if the match is a full name
-    if match in books:
-        return match
-    # If it's an abbreviation, find the corresponding full title
-    for full_name, abbreviations in books.items():
-        if match in abbreviations:
-            return full_name
-    return None  # Return None if no match is found
-
-# Initialize the current book reference to persist across pages
-current_book = None
-
-# Open the PDF file
-with pdfplumber.open("test.pdf") as pdf:
-    verse_references = []
+
+# One verse or verse range (e.g. 16, 16–18, 16–4:2)
+VERSE = r'\d+(?:[–-]\d+(?::\d+)?)?'
+
+@functools.lru_cache(maxsize=None)
+def reference_pattern():
+    """Return the reference scanner's compiled pattern, built on first use and then reused.
+
+    A single pattern for every token the scanner cares about, in one left-to-right pass: a book
+    name (not followed by ":", so "Ps 151:3" is Psalms), a chapter:verse list, or a verse-only
+    reference such as "vv. 4–6" that continues the current chapter.
+    """
+    # A comma-separated verse list; a number followed by ":" or starting a numbered book name
+    # (", 3 Macc") is not part of the list
+    numbered_book = trie_regex([name for name in book_lookup if name[0].isdigit()])
+    verse_list = VERSE + r'(?:,\s*(?!' + numbered_book + r'\b)' + VERSE + r'(?![\d:]))*'
+
+    return re.compile(
+        r'(?P<book>\b' + trie_regex(book_lookup) + r'\b)(?!:)'
+        r'|\b(?P<chapter>\d+):(?P<verses>' + verse_list + r')'
+        r'|\bvv?\.\s*(?P<chapter_verses>' + verse_list + r')'
+    )
+
+# One reference as scanned: book is the full book title (None before any book has been named),
+# verses is a tuple of verse or range strings and start is the offset in the page text
+Reference = namedtuple('Reference', ['book', 'chapter', 'verses', 'start'])
+
+# A verse, a verse range within the chapter or a range running into a later chapter
+verse_range_pattern = re.compile(r'(\d+)(?:[–-](\d+)(?::(\d+))?)?')
+
+# Longest verse range expanded into individual verses; anything longer is a misread
+MAX_RANGE = 200
+
+class ReferenceLexer:
+    """Scan text left to right once, emitting a Reference for every chapter:verse list.
+
+    The current book and chapter carry over between calls, so a reference at the top of a page
+    continues the book named on the page before, and "Rom 8:1, 3; 9:4" yields Romans 8:1, 8:3
+    and 9:4.
+    """
+
+    def __init__(self):
+        self.book = None
+        self.chapter = None
+
+    def tokens(self, text):
+        for match in reference_pattern().finditer(text):
+            book = match.group('book')
+            if book:
+                self.book = book_lookup[book]
+                continue
+
+            if match.group('chapter'):
+                self.chapter = match.group('chapter')
+                verses = match.group('verses')
+            elif self.chapter is not None:
+                verses = match.group('chapter_verses')
+            else:
+                continue  # A verse-only reference with no chapter to attach it to
+
+            yield Reference(self.book, self.chapter, tuple(verse.strip() for verse in verses.split(',')), match.start())
+
+class ReferenceStore:
+    """Compact store of Scripture hits: book ordinal, chapter, verse and page in array columns.
+
+    Pages are 0-based physical page indices; page_labels.page_labels maps them to printed page
+    numbers when the index is written out.
+    """
+
+    def __init__(self):
+        self.books = array('H')
+        self.chapters = array('H')
+        self.verses = array('H')
+        self.pages = array('i')
+        self.skipped = 0  # Hits found before any book was named, or with unreadable numbers
+
+    def __len__(self):
+        return len(self.books)
+
+    def append(self, ordinal, chapter, verse, page):
+        self.books.append(ordinal)
+        self.chapters.append(chapter)
+        self.verses.append(verse)
+        self.pages.append(page)
+
+    def add(self, book, chapter, verse_text, page):
+        """Add one verse or verse range of a chapter ("16", "16–18", "16–4:2") found on a page."""
+        match = verse_range_pattern.fullmatch(verse_text)
+        if book is None or match is None or max(int(chapter), *map(int, filter(None, match.groups()))) > 0xFFFF:
+            self.skipped += 1
+            return
+
+        ordinal = book_ordinals[book]
+        chapter = int(chapter)
+        first_verse = int(match.group(1))
+        end, end_verse = match.group(2), match.group(3)
+
+        if end_verse is not None:
+            # A range into a later chapter is indexed by its first and last verses
+            self.append(ordinal, chapter, first_verse, page)
+            self.append(ordinal, int(end), int(end_verse), page)
+        elif end is not None and first_verse < int(end) <= first_verse + MAX_RANGE:
+            for verse in range(first_verse, int(end) + 1):
+                self.append(ordinal, chapter, verse, page)
+        else:
+            self.append(ordinal, chapter, first_verse, page)
+
+    def sorted_hits(self):
+        """Return the unique hits as rows of (book ordinal, chapter, verse, page) in canonical order."""
+        import numpy as np
+
+        if not len(self):
+            return np.empty((0, 4), dtype=np.int64)
+
+        columns = [np.frombuffer(column, dtype=column.typecode).astype(np.int64)
+                   for column in (self.books, self.chapters, self.verses, self.pages)]
+        # np.unique sorts the rows lexicographically while dropping duplicates
+        return np.unique(np.column_stack(columns), axis=0)
+
+def format_page_ranges(pages, labels=None):
+    """Format sorted unique page indices with consecutive runs merged, e.g. "12, 14–16".
+
+    With labels (page_labels.page_labels), pages are shown by their printed labels, and a run
+    is not merged across a change of numbering, such as from roman front matter to page 1.
+    """
+    if labels is None:
+        labels = [str(page + 1) for page in range(max(pages, default=-1) + 1)]
+
+    ranges = []
+    for page in pages:
+        if ranges and page == ranges[-1][1] + 1 and labels[page].isdigit() == labels[ranges[-1][1]].isdigit():
+            ranges[-1][1] = page
+        else:
+            ranges.append([page, page])
+    return ', '.join(labels[first] if first == last else f"{labels[first]}–{labels[last]}" for first, last in ranges)
+
+def format_scripture_index(store, labels=None):
+    """Return the lines of a finished Scripture index: each book, then each verse with its printed pages."""
+    import numpy as np
+
+    lines = []
+    hits = store.sorted_hits()
+    if not len(hits):
+        return lines
+
+    # Each run of rows with the same book, chapter and verse is one index entry
+    keys = hits[:, :3]
+    starts = np.flatnonzero(np.any(keys[1:] != keys[:-1], axis=1)) + 1
+    current_book = None
+
+    for entry in np.split(hits, starts):
+        ordinal, chapter, verse = (int(value) for value in entry[0, :3])
+        if ordinal != current_book:
+            current_book = ordinal
+            lines.append(book_names[ordinal])
+        lines.append(f"    {chapter}:{verse}    {format_page_ranges(entry[:, 3].tolist(), labels)}")
+
+    return lines
+
+def index_pages(pages, metrics=None):
+    """Collect the Scripture references on PageData pages (in page order) into a ReferenceStore."""
+    verse_references = ReferenceStore()
+    page_count = reference_count = 0
+
+    # The lexer keeps track of the current book across pages
+    lexer = ReferenceLexer()
 
     # Loop through each page of the PDF
-    for i, page in enumerate(pdf.pages):
-        implicit_page_number = i - 25  # Keep track of the implicit page number
-        
-        # Extract text from the page
-        text = page.extract_text()
-        
-        # Find all book references and verse references in the text
-        book_matches = list(book_pattern.finditer(text))
-        verse_matches = list(verse_pattern.finditer(text))
-
-        # Keep a list of book matches to track the closest book before each verse
-        book_positions = []
-
-        for match in book_matches:
-            full_book_name = get_full_book_name(match.group(0))
-            book_positions.append((match.start(), full_book_name))
-        
-        # For each verse, find the closest preceding book reference and handle multiple verses
-        for verse_match in verse_matches:
-            verse_text = verse_match.group(0)  # Get the matched verse reference
-            chapter, verses = verse_text.split(':')  # Split into chapter and verse part
-            individual_verses = verses.split(',')    # Split verses by comma
-
-            # Find the closest preceding book reference
-            verse_position = verse_match.start()
-            for book_position, book_name in reversed(book_positions):
-                if book_position < verse_position:
-                    current_book = book_name
-                    break
-
-            # Append each individual verse reference
-            for verse in individual_verses:
-                verse_references.append({
-                    "verse": f"{chapter}:{verse.strip()}",
-                    "page": implicit_page_number,
-                    "book": current_book
-                })
-
-# Output the list of verse references with page numbers and book titles
-for ref in verse_references:
-    print(f"Book: {ref['book']}, Verse: {ref['verse']}, Page: {ref['page']}")
+    for page in pages:
+        page_count += 1
+
+        for reference in lexer.tokens(page.text):
+            reference_count += 1
+            # Add each individual verse reference, with ranges expanded
+            for verse in reference.verses:
+                verse_references.add(reference.book, reference.chapter, verse, page.index)
+
+    if metrics is not None:
+        metrics.count('pages_scanned', page_count)
+        metrics.count('scripture_references', reference_count)
+        metrics.count('verse_hits', len(verse_references))
+        metrics.count('verse_hits_skipped', verse_references.skipped)
+    return verse_references
+
+def main(file_path, workers=1, cache=None, stream=False, database=None, metrics=None, report_path=None):
+    from page_labels import collect_folio_lines, page_labels
+    from pdf_pages import extract_pages, iter_pages
+
+    if metrics is None:
+        metrics = RunMetrics()
+
+    if stream:
+        # Decode one page at a time so memory stays flat on very long volumes; extraction and
+        # matching are interleaved, so they are timed as one stage
+        with metrics.stage('extract_and_match_scripture'):
+            page_texts = []
+            verse_references = index_pages(collect_folio_lines(iter_pages(file_path), page_texts), metrics)
+    else:
+        # Extract the page text across worker processes
+        with metrics.stage('extract_pages'):
+            pages = extract_pages(file_path, workers=workers, cache=cache)
+        page_texts = [page.text for page in pages]
+        with metrics.stage('match_scripture'):
+            verse_references = index_pages(pages, metrics)
+
+    # Map physical pages to the printed page numbers, from the PDF's page labels or the folios
+    # in the text just scanned
+    with metrics.stage('page_labels'):
+        labels = page_labels(file_path, page_texts, cache)
+
+    # Store the hits so they can be queried later, replacing this document's previous entries
+    if database is not None:
+        database.replace_scripture_hits(document_name(file_path), verse_references)
+        database.replace_page_labels(document_name(file_path), labels)
+
+    # Output the finished Scripture index, sorted in canonical order with merged page lists
+    for line in format_scripture_index(verse_references, labels):
+        print(line)
+
+    if stream and peak_memory_mb() is not None:
+        print(f"Peak memory: {peak_memory_mb():.1f} MB")
+
+    # Write the run report (stage timings, counters and peak memory)
+    if report_path is not None:
+        metrics.write_report(report_path)
+        print(f"Run report written to {report_path}")
+
+if __name__ == "__main__":
+    from page_cache import PageCache
+
+    with PageCache() as cache:  # Shared with auth_index, so either run warms it for the other
+        main("test.pdf", workers=os.cpu_count(), cache=cache, report_path="test.scripture.run.json")
@@ -0,0 +1,62 @@
+from bisect import bisect_right
+import re
+
+# Text in smart double quotes, which the tools treat like italics (quotations and quoted titles)
+QUOTATION = re.compile(r'“.+?”')
+
+def merge_spans(spans):
+    """Merge sorted (start, end) spans that overlap or touch."""
+    merged = []
+    for start, end in spans:
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return [tuple(span) for span in merged]
+
+class SpanMask:
+    """A paragraph's or footnote's text with the character spans of its italic and quoted text.
+
+    Built once from the runs, so the matchers check a match's offsets against the spans (a
+    bisect per check) instead of rebuilding a marked-up copy of the text for every rule. Italic
+    spans are consecutive italic runs merged into one; quoted spans are “...” quotations; the
+    protected spans are both together. run_starts gives the offset of each run in text.
+    """
+
+    def __init__(self, text, run_starts, italic, quoted):
+        self.text = text
+        self.run_starts = run_starts
+        self.italic = italic
+        self.quoted = quoted
+        self.protected = merge_spans(sorted(italic + quoted))
+        self.italic_starts = [start for start, _ in italic]
+        self.protected_starts = [start for start, _ in self.protected]
+
+    @classmethod
+    def from_runs(cls, runs):
+        """Build the mask from (text, italic) pairs, such as docx_stream Runs."""
+        texts = []
+        run_starts = []
+        italic = []
+        offset = 0
+        for run_text, run_italic in runs:
+            run_starts.append(offset)
+            texts.append(run_text)
+            if run_italic and run_text:
+                italic.append((offset, offset + len(run_text)))
+            offset += len(run_text)
+
+        text = ''.join(texts)
+        return cls(text, run_starts, merge_spans(italic), [match.span() for match in QUOTATION.finditer(text)])
+
+    def is_protected(self, start, end):
+        """Check whether text[start:end] overlaps italic or quoted text."""
+        i = bisect_right(self.protected_starts, end - 1) - 1  # The last span starting inside or before it
+        return i >= 0 and self.protected[i][1] > start
+
+    def italic_end(self, offset):
+        """Return the end of the italic span containing offset, or None if the text there is not italic."""
+        i = bisect_right(self.italic_starts, offset) - 1
+        if i >= 0 and self.italic[i][1] > offset:
+            return self.italic[i][1]
+        return None
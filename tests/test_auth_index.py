@@ -0,0 +1,36 @@
+from auth_index import is_contents_page, locate_bibliography_in_pages
+
+CONTENTS = "CONTENTS\nPreface . . . . ix\n1 Introduction 1\nBibliography . . . . 200\nIndex of Authors 230"
+BODY = "body text of a chapter\nmore body text"
+
+def running_head(page):
+    return f"BIBLIOGRAPHY {page}\nSmith, J. A Book. London: SPCK, 2003.\nJones, K. Another. Leiden: Brill, 1999."
+
+def test_contents_page_is_recognized():
+    assert is_contents_page(CONTENTS.splitlines())
+    assert not is_contents_page(running_head(12).splitlines())
+
+def test_range_starts_where_the_running_heads_start():
+    pages = [CONTENTS, BODY, BODY, "BIBLIOGRAPHY\nAdams, A. A Book. 2001.",
+             *(running_head(page) for page in range(201, 206)), "INDEX OF AUTHORS\nAdams 3"]
+
+    assert locate_bibliography_in_pages(pages) == (3, 8)
+
+def test_running_heads_on_recto_pages_only():
+    pages = [CONTENTS, BODY, "BIBLIOGRAPHY\nAdams, A. A Book. 2001.", "202 THE BOOK\nEntry.",
+             running_head(203), "204 THE BOOK\nEntry.", running_head(205), "206 THE BOOK\nEntry.", BODY]
+
+    assert locate_bibliography_in_pages(pages) == (2, 7)
+
+def test_single_heading_after_the_contents_page():
+    pages = [CONTENTS, BODY, "Bibliography\nAdams, A. A Book. 2001.", "Brown, B. Another. 2002."]
+
+    assert locate_bibliography_in_pages(pages) == (2, 3)
+
+def test_chapter_bibliography_is_not_merged_into_the_main_one():
+    pages = [CONTENTS, "Select Bibliography\nEntry.", BODY, "BIBLIOGRAPHY\nEntry.", running_head(5), BODY + "\n6"]
+
+    assert locate_bibliography_in_pages(pages) == (3, 4)
+
+def test_no_bibliography():
+    assert locate_bibliography_in_pages([CONTENTS, BODY]) is None
@@ -0,0 +1,20 @@
+from bibliography import Bibliography, surname_core
+
+ENTRIES = [
+    "van der Horst, Pieter W. Studies in Ancient Judaism. Leiden: Brill, 1998.",
+    "Horst, Friedrich. Hiob. Neukirchen: Neukirchener, 1968.",
+]
+
+def test_surname_core_strips_leading_particles():
+    assert surname_core("van der Horst") == "horst"
+    assert surname_core("De") == "de"
+
+def test_particle_surname_is_found_by_its_core():
+    bibliography = Bibliography.from_texts(ENTRIES)
+    assert bibliography.lookup("Horst", "Studies in Ancient Judaism").text == ENTRIES[0]
+    assert bibliography.lookup("Horst", "Studies").text == ENTRIES[0]
+    assert bibliography.lookup("van der Horst", "Studies in Ancient Judaism").text == ENTRIES[0]
+
+def test_full_surname_wins_over_core():
+    bibliography = Bibliography.from_texts(ENTRIES)
+    assert bibliography.lookup("Horst", "Hiob").text == ENTRIES[1]
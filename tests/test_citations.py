@@ -0,0 +1,15 @@
+from Citations import CitationIndex, iter_citations
+from spans import SpanMask
+
+def test_surname_inside_italic_title_is_not_a_citation():
+    footnote = SpanMask.from_runs([("Wright, ", False), ("Paul, Apostle of the Faithfulness of God", True), (", 12.", False)])
+
+    assert [citation for _, _, citation in iter_citations(footnote)] == [
+        'Wright, "Paul, Apostle of the Faithfulness of God"']
+    assert 'Paul' not in CitationIndex([footnote]).by_surname
+
+def test_italic_and_quoted_titles_are_both_found():
+    footnote = SpanMask.from_runs([("See Dunn, ", False), ("Jesus Remembered", True), ("; Wright, “The Resurrection,” 3.", False)])
+
+    assert [(surname, title) for surname, title, _ in iter_citations(footnote)] == [
+        ('Dunn', 'Jesus Remembered'), ('Wright', 'The Resurrection,')]
@@ -0,0 +1,46 @@
+import zipfile
+from docx_stream import iter_footnotes
+
+W = 'http://schemas.openxmlformats.org/wordprocessingml/2006/main'
+
+def write_footnotes(path, body):
+    """Write a minimal .docx zip holding only a footnotes part with one footnote."""
+    xml = (f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+           f'<w:footnotes xmlns:w="{W}">'
+           f'<w:footnote w:type="separator" w:id="-1"><w:p><w:r><w:separator/></w:r></w:p></w:footnote>'
+           f'<w:footnote w:id="1"><w:p>{body}</w:p></w:footnote>'
+           f'</w:footnotes>')
+    with zipfile.ZipFile(path, 'w') as docx:
+        docx.writestr('word/footnotes.xml', xml)
+    return path
+
+def test_footnote_keeps_text_in_insertions_and_smart_tags(tmp_path):
+    path = write_footnotes(tmp_path / 'notes.docx',
+                           '<w:r><w:t xml:space="preserve">See Smith, </w:t></w:r>'
+                           '<w:ins w:id="1" w:author="A"><w:r><w:rPr><w:i/></w:rPr><w:t>Long Title</w:t></w:r></w:ins>'
+                           '<w:smartTag w:element="x"><w:r><w:t xml:space="preserve"> 12.</w:t></w:r></w:smartTag>')
+
+    footnote, = iter_footnotes(path)
+
+    assert footnote.text == 'See Smith, Long Title 12.'
+    assert [run.italic for run in footnote.runs] == [False, True, False]
+
+def test_footnote_keeps_text_in_fields_and_content_controls(tmp_path):
+    path = write_footnotes(tmp_path / 'notes.docx',
+                           '<w:fldSimple w:instr="REF x"><w:r><w:t>Field</w:t></w:r></w:fldSimple>'
+                           '<w:sdt><w:sdtContent><w:r><w:t xml:space="preserve"> control</w:t></w:r></w:sdtContent></w:sdt>'
+                           '<w:customXml w:element="y"><w:r><w:t xml:space="preserve"> custom</w:t></w:r></w:customXml>')
+
+    footnote, = iter_footnotes(path)
+
+    assert footnote.text == 'Field control custom'
+
+def test_footnote_drops_deleted_and_moved_text(tmp_path):
+    path = write_footnotes(tmp_path / 'notes.docx',
+                           '<w:r><w:t>Kept</w:t></w:r>'
+                           '<w:del w:id="2" w:author="A"><w:r><w:delText>Gone</w:delText></w:r></w:del>'
+                           '<w:moveFrom w:id="3" w:author="A"><w:r><w:t>Moved</w:t></w:r></w:moveFrom>')
+
+    footnote, = iter_footnotes(path)
+
+    assert footnote.text == 'Kept'
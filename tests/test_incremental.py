@@ -0,0 +1,59 @@
+import incremental
+import scrip_index
+from benchmarks.corpus import write_pdf
+from books import book_ordinals
+from index_db import IndexDatabase, document_name
+
+def write_pages(path, texts):
+    write_pdf(path, [[(72, 720, text)] for text in texts])
+    return path
+
+def test_shifted_pages_are_extracted_in_one_batch(tmp_path, monkeypatch):
+    texts = ["Genesis 1:1", "see 2:3", "and 4:5", "Exodus 3:2", "also v. 7", "Rom 8:1", "then 9:4"]
+    path = write_pages(tmp_path / 'volume.pdf', texts)
+    with IndexDatabase(str(tmp_path / 'index.sqlite')) as database:
+        incremental.reindex(database, str(path))
+
+        # Renaming the book on the first page changes the state the next three pages start from
+        write_pages(path, ["Leviticus 1:1", *texts[1:]])
+        calls = []
+        extract_pages = incremental.extract_pages
+        monkeypatch.setattr(incremental, 'extract_pages',
+                            lambda *args, **kwargs: calls.append(list(args[1])) or extract_pages(*args, **kwargs))
+        diff = incremental.reindex(database, str(path))
+        hits = database.scripture_hits_by_page(document_name(path))
+
+    assert calls == [[0], [1, 2, 3]]
+    assert diff.rematched_pages == [0, 1, 2, 3]
+
+    # The patched index matches one built from scratch
+    monkeypatch.undo()
+    with IndexDatabase(str(tmp_path / 'fresh.sqlite')) as fresh:
+        incremental.reindex(fresh, str(path))
+        assert fresh.scripture_hits_by_page(document_name(path)) == hits
+
+def test_same_named_volumes_are_kept_apart(tmp_path):
+    (tmp_path / 'a').mkdir()
+    (tmp_path / 'b').mkdir()
+    first = write_pages(tmp_path / 'a' / 'volume.pdf', ["Genesis 1:1"])
+    second = write_pages(tmp_path / 'b' / 'volume.pdf', ["Exodus 3:2"])
+    with IndexDatabase(str(tmp_path / 'index.sqlite')) as database:
+        incremental.reindex(database, str(first))
+        incremental.reindex(database, str(second))
+
+        assert [row[0] for row in database.find_scripture("Gen 1:1")] == [document_name(first)]
+        assert [row[0] for row in database.find_scripture("Exod 3:2")] == [document_name(second)]
+
+def test_full_rebuild_between_reindexes(tmp_path):
+    path = write_pages(tmp_path / 'volume.pdf', ["Genesis 1:1", "Exodus 2:2", "Romans 3:3"])
+    with IndexDatabase(str(tmp_path / 'index.sqlite')) as database:
+        incremental.reindex(database, str(path))
+
+        # A full rebuild of a new version replaces the hits, so the stored states must not be reused
+        write_pages(path, ["Preface", "Genesis 1:1", "Exodus 2:2", "Romans 3:3"])
+        scrip_index.main(str(path), database=database)
+        incremental.reindex(database, str(path))
+        hits = database.scripture_hits_by_page(document_name(path))
+
+    assert hits == {1: {(book_ordinals['Genesis'], 1, 1)}, 2: {(book_ordinals['Exodus'], 2, 2)},
+                    3: {(book_ordinals['Romans'], 3, 3)}}
@@ -0,0 +1,25 @@
+import numpy as np
+from layout import CHAR_DTYPE, hanging_indent_entries, indent_columns, page_lines
+
+def test_columns_with_a_single_margin_line():
+    lines = [(72, 'Zed, Z. Title'), (90, 'cont one'), (90, 'cont two'), (90, 'cont three')]
+    assert indent_columns([x for x, _ in lines]) == (72.0, 90.0)
+    assert hanging_indent_entries([lines]) == ['Zed, Z. Title cont one cont two cont three']
+
+def test_columns_ignore_jitter_and_one_off_starts():
+    starts = [72.0, 72.4, 90.0, 89.8, 72.0, 90.0, 300.0]
+    assert indent_columns(starts) == (72.0, 90.0)
+
+def test_entries_continue_across_pages():
+    first_page = [(72, 'Able, A. One'), (90, 'more of one'), (72, 'Baker, B. Two'), (90, 'more of two')]
+    second_page = [(90, 'end of two'), (90, 'still two')]
+    third_page = [(90, 'last of two'), (72, 'Cole, C. Three'), (72, 'Dunn, D. Four')]
+    assert hanging_indent_entries([first_page, second_page, third_page]) == [
+        'Able, A. One more of one', 'Baker, B. Two more of two end of two still two last of two',
+        'Cole, C. Three', 'Dunn, D. Four']
+
+def test_page_lines_groups_chars_by_baseline():
+    # The superscript "1" is raised less than half a line, so it stays on the first line
+    chars = np.array([(77, 82, 100, 110, 'b'), (72, 77, 100, 110, 'a'), (90, 95, 100, 110, 'c'),
+                      (72, 77, 120, 130, 'd'), (82, 84, 99, 107, '1')], dtype=CHAR_DTYPE)
+    assert page_lines(chars) == [(72.0, 'ab1 c'), (72.0, 'd')]
@@ -0,0 +1,34 @@
+import zipfile
+from docx import Document
+import LNTS_abbrev
+
+def make_document(path):
+    document = Document()
+    document.add_paragraph("As in Matt 5 and Rom 8, ")
+    document.paragraphs[0].add_run("Matt 6").italic = True
+    document.save(path)
+    return path
+
+def read_raw_members(path):
+    with open(path, 'rb') as file, zipfile.ZipFile(file) as docx:
+        return {info.filename: LNTS_abbrev.read_raw_member(file, info) for info in docx.infolist()}
+
+def test_rewrite_copies_untouched_members_byte_for_byte(tmp_path):
+    source = make_document(tmp_path / 'in.docx')
+    output = tmp_path / 'out.docx'
+
+    LNTS_abbrev.rewrite_document(source, output, LNTS_abbrev.abbrev_dict)
+
+    before, after = read_raw_members(source), read_raw_members(output)
+    assert list(before) == list(after)
+    assert all(before[name] == after[name] for name in before if name != 'word/document.xml')
+    assert before['word/document.xml'] != after['word/document.xml']
+    assert Document(output).paragraphs[0].text == "As in Mt. 5 and Rom. 8, Matt 6"
+
+def test_rewrite_in_place(tmp_path):
+    path = make_document(tmp_path / 'in.docx')
+
+    LNTS_abbrev.rewrite_document(path, path, LNTS_abbrev.abbrev_dict)
+
+    assert Document(path).paragraphs[0].text == "As in Mt. 5 and Rom. 8, Matt 6"
+    assert [file.name for file in tmp_path.iterdir()] == ['in.docx']
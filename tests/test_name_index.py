@@ -0,0 +1,25 @@
+from name_index import NameIndex, name_variants
+
+def test_variants_of_a_particle_name():
+    assert name_variants("van der Horst") == {('van', 'der', 'horst'), ('horst',)}
+    assert name_variants("Schüssler-Fiorenza") == {('schussler', 'fiorenza')}
+
+def test_possessives_and_apostrophes():
+    index = NameIndex(["Bauckham", "Jesus", "O'Neill"])
+    assert index.found_names("Bauckham's reading, Jesus’ sayings and O’Neill’s essay") == {
+        "Bauckham", "Jesus", "O'Neill"}
+
+def test_diacritics_either_way():
+    assert NameIndex(["Käsemann"]).found_names("as Kasemann argued") == {"Käsemann"}
+    assert NameIndex(["Kasemann"]).found_names("as Käsemann argued") == {"Kasemann"}
+
+def test_particle_names_with_and_without_particles():
+    index = NameIndex(["van der Horst", "Horst"])
+    assert index.found_names("see van der Horst, Studies") == {"van der Horst", "Horst"}
+    assert index.found_names("so Horst concludes") == {"van der Horst", "Horst"}
+    assert NameIndex(["van der Horst"]).found_names("see Van der Horst") == {"van der Horst"}
+
+def test_lowercase_common_words_are_not_names():
+    index = NameIndex(["Wright", "Hope"])
+    assert index.found_names("the right hope of the wright") == set()
+    assert index.found_names("Wright and Hope") == {"Wright", "Hope"}
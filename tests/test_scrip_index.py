@@ -0,0 +1,39 @@
+from books import book_ordinals
+from scrip_index import ReferenceLexer, ReferenceStore
+
+def references(*texts):
+    lexer = ReferenceLexer()
+    return [(reference.book, reference.chapter, reference.verses) for text in texts for reference in lexer.tokens(text)]
+
+def test_verse_list_and_chapter_change():
+    assert references("Rom 8:1, 3; 9:4") == [('Romans', '8', ('1', '3')), ('Romans', '9', ('4',))]
+
+def test_ranges():
+    assert references("Gen 1:1–2:3", "John 3:16-18") == [('Genesis', '1', ('1–2:3',)), ('John', '3', ('16-18',))]
+
+def test_numbered_book_ends_a_verse_list():
+    assert references("1 Cor 15:3–5, 2 Cor 5:17") == [('1 Corinthians', '15', ('3–5',)),
+                                                      ('2 Corinthians', '5', ('17',))]
+
+def test_verse_only_references_continue_the_chapter():
+    assert references("vv. 2", "Isa 53:4 and vv. 7, 9", "v. 12") == [
+        ('Isaiah', '53', ('4',)), ('Isaiah', '53', ('7', '9')), ('Isaiah', '53', ('12',))]
+
+def test_book_carries_over_between_pages():
+    assert references("Exodus 3:2 ends one page", "and 4:5 starts the next") == [
+        ('Exodus', '3', ('2',)), ('Exodus', '4', ('5',))]
+
+def test_store_expands_ranges_and_sorts_unique_hits():
+    store = ReferenceStore()
+    store.add('Romans', '8', '3–5', 7)
+    store.add('Romans', '8', '4', 7)
+    store.add('Genesis', '1', '31–2:3', 2)
+    store.add('Romans', '8', '1–900', 9)  # Too long to be a real range: only its first verse
+    store.add(None, '1', '1', 0)  # No book named yet
+    store.add('Romans', '8', 'x', 0)
+
+    romans, genesis = book_ordinals['Romans'], book_ordinals['Genesis']
+    assert store.skipped == 2
+    assert store.sorted_hits().tolist() == [
+        [genesis, 1, 31, 2], [genesis, 2, 3, 2],
+        [romans, 8, 1, 9], [romans, 8, 3, 7], [romans, 8, 4, 7], [romans, 8, 5, 7]]
@@ -0,0 +1,63 @@
+import re
+
+def trie_regex(terms):
+    """Build a regex matching any of the terms, factored into a character trie."""
+    trie = {}
+    for term in terms:
+        node = trie
+        for char in term:
+            node = node.setdefault(char, {})
+        node[''] = True  # Marks the end of a term
+
+    return _node_regex(trie)
+
+def _node_regex(node):
+    """Turn one trie node into a regex fragment, preferring the longest branch."""
+    branches = [re.escape(char) + _node_regex(child) for char, child in sorted(node.items()) if char]
+    if not branches:
+        return ''
+
+    body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+    if '' in node:
+        # A term ends here, so the longer branches are optional (greedy, so longest wins)
+        return f'(?:{body})?'
+    return body
+
+def _is_word_boundary(text, index):
+    """Check whether a regex \\b would match at index inside text."""
+    return (text[index - 1].isalnum() or text[index - 1] == '_') != (text[index].isalnum() or text[index] == '_')
+
+class WordMatcher:
+    """Find every whole-word occurrence of a fixed set of terms with one scan per text."""
+
+    def __init__(self, terms):
+        self.terms = list(dict.fromkeys(term for term in terms if term))  # Unique, in original order
+        known = set(self.terms)
+
+        # Shorter terms that start at the same place as a longer one and also end on a word
+        # boundary inside it (e.g. "Smith" inside "Smith Jr"), since the regex only reports the longest
+        self.nested = {}
+        for term in self.terms:
+            shorter = [term[:i] for i in range(len(term) - 1, 0, -1)
+                       if term[:i] in known and _is_word_boundary(term, i)]
+            if shorter:
+                self.nested[term] = shorter
+
+        # The lookahead lets matches overlap, so "Horst" is still found inside "van der Horst"
+        self.pattern = re.compile(r'(?=\b(' + trie_regex(self.terms) + r')\b)') if self.terms else None
+
+    def finditer(self, text):
+        """Yield (start, end, term) for every term occurrence in the text, in text order."""
+        if self.pattern is None:
+            return
+
+        for match in self.pattern.finditer(text):
+            start = match.start()
+            term = match.group(1)
+            yield start, start + len(term), term
+            for shorter in self.nested.get(term, ()):
+                yield start, start + len(shorter), shorter
+
+    def found_terms(self, text):
+        """Return the set of terms that occur in the text."""
+        return {term for _, _, term in self.finditer(text)}